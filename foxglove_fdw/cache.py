@@ -0,0 +1,246 @@
+"""
+In-process response cache for foxglove_fdw.
+
+Postgres frequently re-executes an identical foreign scan within seconds
+(dashboard refreshes, repeated JOIN sides, EXPLAIN ANALYZE). Multicorn workers
+are long-lived Python processes, so a small cache-aside layer in front of the
+list endpoints turns those repeats into a dict lookup instead of an HTTP round
+trip plus JSON parse.
+
+Currently exposes:
+  - cached_get(session, url, params, ttl, stale_if_error=0): GET `url` and
+    return the parsed JSON, served from memory when an identical request was
+    made less than `ttl` seconds ago. Expired entries are revalidated with
+    If-None-Match when the server sent an ETag, so an unchanged listing costs
+    a 304 instead of a download and parse. With stale_if_error > 0, an expired
+    entry up to that many seconds past its TTL is served (with a WARNING)
+    when the refresh fails with a connection error, 429 or 5xx
+  - cached_iter(session, url, params, ttl, stale_if_error=0): same contract
+    for endpoints that return a JSON array, but on a miss the body is parsed incrementally with
+    ijson and elements are yielded as they arrive off the socket
+  - cached_get_many(session, url, params_list, ttl, max_workers): cached_get for
+    several parameter sets at once, issued concurrently on a thread pool
+  - cached_post(session, url, body, ttl): POST a JSON body and cache the parsed
+    response, for endpoints whose answer is a function of the body alone
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import math
+import threading
+import time
+import ijson
+import requests
+from multicorn.utils import log_to_postgres, WARNING
+from .http import JSON_HEADERS
+from .utils import json_dumps, json_loads
+
+MAXSIZE = 256
+
+_CacheKey = Tuple[Any, str, Any]
+# key -> (expiry, parsed body, ETag); expired entries are kept for revalidation
+_CacheEntry = Tuple[float, Any, Optional[str]]
+_cache: "OrderedDict[_CacheKey, _CacheEntry]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cached_get(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, Any],
+    ttl: float,
+    timeout: float = 60,
+    stale_if_error: float = 0,
+) -> Any:
+    """Return the parsed JSON body of `GET url?params`, caching it for `ttl` seconds.
+
+    The cached object is shared between callers and must be treated as
+    read-only. A `ttl` of 0 (or less) bypasses the cache entirely.
+    Raises requests.HTTPError for non-2xx responses (these are never cached),
+    unless a stale entry within `stale_if_error` seconds can stand in.
+
+    An expired entry that came with an ETag is revalidated with If-None-Match;
+    a 304 renews it for another `ttl` without transferring or parsing a body.
+    """
+    if ttl <= 0:
+        return _fetch(session, url, params, timeout)
+
+    key = _cache_key(session, url, params)
+    hit = _lookup(key)
+    if hit is not None:
+        return hit[1]
+    prev = _lookup(key, grace=math.inf)
+    try:
+        r = session.get(url, params=params, headers=_request_headers(prev), timeout=timeout)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        return _stale_or_raise(key, e, url, stale_if_error)
+    if r.status_code == 304 and prev is not None:
+        _store(key, prev[1], ttl, prev[2])
+        return prev[1]
+    data = json_loads(r.content)
+    _store(key, data, ttl, r.headers.get("ETag"))
+    return data
+
+
+def cached_get_many(
+    session: requests.Session,
+    url: str,
+    params_list: List[Dict[str, Any]],
+    ttl: float,
+    max_workers: int,
+    timeout: float = 60,
+) -> List[Any]:
+    """Run cached_get() for each entry of `params_list`, returning results in order.
+
+    Requests overlap on up to `max_workers` threads (the session's connection
+    pool is thread-safe), so wall time is roughly the slowest request rather
+    than the sum. The first HTTPError raised by any request is re-raised here.
+    """
+    if len(params_list) <= 1 or max_workers <= 1:
+        return [cached_get(session, url, p, ttl, timeout) for p in params_list]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(params_list))) as pool:
+        return list(pool.map(lambda p: cached_get(session, url, p, ttl, timeout), params_list))
+
+
+def cached_post(
+    session: requests.Session,
+    url: str,
+    body: Dict[str, Any],
+    ttl: float,
+    timeout: float = 60,
+) -> Any:
+    """Return the parsed JSON response to `POST url` with `body`, caching it for `ttl` seconds.
+
+    Same contract as cached_get(); the body is keyed by its serialized form so
+    key order and nested lists don't matter.
+    """
+    key = (session.headers.get("Authorization"), url, json_dumps(sorted(body.items())))
+    hit = _lookup(key) if ttl > 0 else None
+    if hit is not None:
+        return hit[1]
+    r = session.post(url, json=body, headers=JSON_HEADERS, timeout=timeout)
+    r.raise_for_status()
+    data = json_loads(r.content)
+    if ttl > 0:
+        _store(key, data, ttl)
+    return data
+
+
+def cached_iter(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, Any],
+    ttl: float,
+    timeout: float = 60,
+    stale_if_error: float = 0,
+) -> Iterator[Any]:
+    """Iterate the elements of the JSON array returned by `GET url?params`.
+
+    The request is issued (and raise_for_status() checked) eagerly, so HTTP
+    errors surface at the call site rather than on the first next(); a stale
+    entry can stand in for them, and an expired entry is revalidated with its
+    ETag, exactly as in cached_get(). Elements are then parsed lazily from the
+    response stream. The collected list is only cached once the stream has
+    been fully consumed; a scan abandoned early (e.g. by a LIMIT) is not
+    cached.
+    """
+    key = _cache_key(session, url, params) if ttl > 0 else None
+    prev: Optional[_CacheEntry] = None
+    if key is not None:
+        hit = _lookup(key)
+        if hit is not None:
+            return iter(hit[1])
+        prev = _lookup(key, grace=math.inf)
+    try:
+        r = session.get(url, params=params, headers=_request_headers(prev), timeout=timeout, stream=True)
+        try:
+            r.raise_for_status()
+        except requests.HTTPError:
+            r.content  # read the (small) error body so callers can still report it
+            r.close()
+            raise
+    except requests.RequestException as e:
+        if key is None:
+            raise
+        return iter(_stale_or_raise(key, e, url, stale_if_error))
+    if r.status_code == 304 and key is not None and prev is not None:
+        r.close()
+        _store(key, prev[1], ttl, prev[2])
+        return iter(prev[1])
+    return _stream_items(r, key, ttl)
+
+
+def _stream_items(r: requests.Response, key: Optional[_CacheKey], ttl: float) -> Iterator[Any]:
+    collected: List[Any] = []
+    try:
+        r.raw.decode_content = True  # let urllib3 undo gzip/deflate transfer encoding
+        # use_float keeps numbers as float (the stdlib json behaviour) instead of Decimal
+        for item in ijson.items(r.raw, "item", use_float=True):
+            if key is not None:
+                collected.append(item)
+            yield item
+    finally:
+        r.close()
+    if key is not None:
+        _store(key, collected, ttl, r.headers.get("ETag"))
+
+
+def _cache_key(session: requests.Session, url: str, params: Dict[str, Any]) -> _CacheKey:
+    # Key on the credentials too so cached rows never leak across API keys.
+    return (session.headers.get("Authorization"), url, tuple(sorted(params.items())))
+
+
+def _lookup(key: _CacheKey, grace: float = 0) -> Optional[_CacheEntry]:
+    # expired entries stay in the LRU until evicted, so `grace` can still reach
+    # them (math.inf: any entry, e.g. to revalidate its ETag)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is None or hit[0] + grace <= time.monotonic():
+            return None
+        _cache.move_to_end(key)
+        return hit
+
+
+def _store(key: _CacheKey, data: Any, ttl: float, etag: Optional[str] = None) -> None:
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + ttl, data, etag)
+        _cache.move_to_end(key)
+        while len(_cache) > MAXSIZE:
+            _cache.popitem(last=False)
+
+
+def _request_headers(prev: Optional[_CacheEntry]) -> Dict[str, str]:
+    # revalidate an expired entry instead of re-downloading it when we can
+    if prev is not None and prev[2]:
+        return {**JSON_HEADERS, "If-None-Match": prev[2]}
+    return JSON_HEADERS
+
+
+def _stale_or_raise(key: _CacheKey, e: requests.RequestException, url: str, stale_if_error: float) -> Any:
+    # must be called from an `except` block: re-raises `e` when nothing usable is cached
+    stale = _lookup(key, grace=stale_if_error) if stale_if_error > 0 and _is_transient(e) else None
+    if stale is None:
+        raise e
+    log_to_postgres(
+        f"foxglove_fdw: {url} failed ({e}); serving a cached response up to {stale_if_error:g}s stale",
+        level=WARNING,
+    )
+    return stale[1]
+
+
+def _is_transient(e: requests.RequestException) -> bool:
+    # worth riding out on a stale copy: the network, rate limiting, or a server fault
+    if not isinstance(e, requests.HTTPError):
+        return True
+    status = e.response.status_code if e.response is not None else 0
+    return status == 429 or status >= 500
+
+
+def _fetch(session: requests.Session, url: str, params: Dict[str, Any], timeout: float) -> Any:
+    r = session.get(url, params=params, headers=JSON_HEADERS, timeout=timeout)
+    r.raise_for_status()
+    # parse the bytes directly rather than via r.text's charset detection + decode
+    return json_loads(r.content)
@@ -14,11 +14,13 @@ Exposed columns:
   tolerance       integer       (echo of the request parameter used)
 
 Push-down filters:
-  - device_id (=)        -> deviceId
+  - device_id (= / IN)   -> deviceId (one request per device for IN, issued in parallel)
   - device_name (=)      -> deviceName
   - start_time (> >= = < <=) mapped to API `start` / `end` bounds
   - end_time   (> >= = < <=) mapped similarly (start/end inclusive)
   - tolerance (=) sets request tolerance (seconds). Defaults to 30 when unspecified.
+  - limit (=) on an optional pseudo column caps emitted rows client-side (the
+    endpoint has no limit parameter); the response stream is abandoned early.
 
 API requirements:
   - Both `start` and `end` query parameters are required. If the user only
@@ -34,6 +36,14 @@ Sorting:
 
 Pseudo columns:
   - tolerance (int) is surfaced so a query can restrict or project it.
+  - limit (int) echoes the `limit = N` cap, if any.
+
+Server options:
+  - base_url   defaults to https://api.foxglove.dev/v1
+  - cache_ttl  seconds to reuse an identical API response (default 10; 0 disables)
+  - use_http2  send requests over HTTP/2 via httpx (default false; needs the
+               `http2` extra, otherwise falls back to HTTP/1.1)
+  - max_parallel_requests  concurrent requests for `device_id IN (...)` (default 8)
 
 Example usage:
   SELECT * FROM foxglove_coverage
@@ -46,14 +56,44 @@ Example usage:
 from __future__ import annotations
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 import requests, datetime as dt
-from .utils import to_iso8601, parse_dt
+from .cache import cached_get, cached_get_many, cached_iter
+from .http import get_session
+from .utils import RANGE_OPS, TimeQualHandler, TimeWindow, to_iso8601, parse_dt, parse_option, as_bool
+
+# (field_name, operator, str(value), parsed RHS datetime for range quals)
+CompiledQual = Tuple[str, str, str, Optional[dt.datetime]]
 
 
 class FoxgloveCoverageFDW(ForeignDataWrapper):
     # Only provide local sort support hints (no push-down since API lacks sort params)
     SUPPORTED_SORT_FIELDS = {"start_time", "end_time"}
+    TIME_FIELDS = {"start_time", "end_time"}
+    # SQL column -> value from one API coverage record (tolerance is added per scan)
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        "device_id": lambda rec: (rec.get("device") or {}).get("id") or rec.get("deviceId"),
+        "device_name": lambda rec: (rec.get("device") or {}).get("name"),
+        "start_time": lambda rec: rec.get("start"),
+        "end_time": lambda rec: rec.get("end"),
+        "status": lambda rec: rec.get("status"),  # deprecated
+        "import_status": lambda rec: rec.get("importStatus"),
+    }
+    DEFAULT_CACHE_TTL = 10.0  # seconds; coverage grows as devices upload
+    DEFAULT_MAX_PARALLEL_REQUESTS = 8
+    # (field, op) -> how a time qual narrows the API's start/end window
+    TIME_QUAL_HANDLERS: Dict[Tuple[str, str], TimeQualHandler] = {
+        ("start_time", ">"): TimeWindow.raise_lower,
+        ("start_time", ">="): TimeWindow.raise_lower,
+        ("start_time", "="): TimeWindow.pin,
+        ("start_time", "<"): TimeWindow.lower_upper,
+        ("start_time", "<="): TimeWindow.lower_upper,
+        ("end_time", ">"): TimeWindow.raise_lower,
+        ("end_time", ">="): TimeWindow.raise_lower,
+        ("end_time", "="): TimeWindow.pin,
+        ("end_time", "<"): TimeWindow.lower_upper,
+        ("end_time", "<="): TimeWindow.lower_upper,
+    }
 
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
@@ -65,6 +105,13 @@ class FoxgloveCoverageFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        self.cache_ttl = parse_option(options, "cache_ttl", self.DEFAULT_CACHE_TTL, float)
+        self.use_http2 = parse_option(options, "use_http2", False, as_bool)
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url, self.use_http2)
+        self.max_parallel_requests = parse_option(
+            options, "max_parallel_requests", self.DEFAULT_MAX_PARALLEL_REQUESTS, int
+        )
 
     # ---------- planner --------------------------------------------------
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -87,54 +134,60 @@ class FoxgloveCoverageFDW(ForeignDataWrapper):
     ):
         params: Dict[str, Any] = {"includeEdgeRecordings": "true"}
         # Time range accumulation
-        start_lower: Optional[str] = None
-        end_upper: Optional[str] = None
+        window = TimeWindow()
         tolerance: Optional[int] = None
+        limit_: Optional[int] = None  # client-side cap; the endpoint has no limit param
+        # deviceId values to fan out over when `device_id IN (...)` is given
+        device_ids: Optional[List[Any]] = None
+        # ids of quals the API request fully enforces; the rest are post-filtered
+        pushed: set[int] = set()
+        # time quals only bound the request window; the endpoint still returns
+        # ranges overlapping it, which Postgres may reject on recheck
+        time_quals: List = []
 
         for q in quals:
             fn = q.field_name
             op = getattr(q, "operator", "=")
 
             # Time bounds mapping similar to recordings/events
-            if fn == "start_time" and op in (">", ">=", "="):
-                iso = to_iso8601(q.value)
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
-                if op == "=":
-                    if end_upper is None or iso < end_upper:
-                        end_upper = iso
-                continue
-            if fn == "start_time" and op in ("<", "<="):
-                iso = to_iso8601(q.value)
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                continue
-            if fn == "end_time" and op in ("<", "<=", "="):
-                iso = to_iso8601(q.value)
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                if op == "=":
-                    if start_lower is None or iso > start_lower:
-                        start_lower = iso
+            handler = self.TIME_QUAL_HANDLERS.get((fn, op))
+            if handler is not None:
+                handler(window, to_iso8601(q.value))
+                pushed.add(id(q))
+                time_quals.append(q)
                 continue
-            if fn == "end_time" and op in (">", ">="):
-                iso = to_iso8601(q.value)
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
+
+            # device_id IN (...): the endpoint takes a single deviceId, so issue
+            # one request per device below and concatenate the results
+            if fn == "device_id" and op == ("=", True) and isinstance(q.value, (list, tuple)):
+                ids = list(dict.fromkeys(q.value))  # dedupe, keep order
+                device_ids = ids if device_ids is None else [d for d in device_ids if d in ids]
+                pushed.add(id(q))
                 continue
 
             # Equality push-downs
             if op == "=":
                 if fn == "device_id":
                     params["deviceId"] = q.value
+                    pushed.add(id(q))
                 elif fn == "device_name":
                     params["deviceName"] = q.value
+                    pushed.add(id(q))
                 elif fn == "tolerance":
                     try:
                         tolerance = int(q.value)
+                        pushed.add(id(q))
+                    except Exception:
+                        pass
+                elif fn == "limit":
+                    try:
+                        limit_ = int(q.value)
+                        pushed.add(id(q))
                     except Exception:
                         pass
 
+        start_lower, end_upper = window.lower, window.upper
+
         # Provide default tolerance if not overridden
         if tolerance is None:
             tolerance = 30
@@ -153,70 +206,128 @@ class FoxgloveCoverageFDW(ForeignDataWrapper):
         params["start"] = start_lower
         params["end"] = end_upper
 
+        if device_ids is not None and "deviceId" in params:
+            # `device_id = x AND device_id IN (...)`
+            only = str(params.pop("deviceId"))
+            device_ids = [d for d in device_ids if str(d) == only]
+        if device_ids is not None and not device_ids:
+            return
+
         # ---- HTTP call --------------------------------------------------
+        # Stream the response array unless it has to be sorted locally first
+        sk = sortkeys[0] if sortkeys and sortkeys[0].attname in self.SUPPORTED_SORT_FIELDS else None
+        session = self._session
+        url = f"{self.base_url}/data/coverage"
         try:
-            r = requests.get(
-                f"{self.base_url}/data/coverage",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
-                timeout=60,
-            )
-            r.raise_for_status()
+            cov_ranges: Iterable[dict]
+            if device_ids is not None and len(device_ids) > 1:
+                pages = cached_get_many(
+                    session,
+                    url,
+                    [{**params, "deviceId": d} for d in device_ids],
+                    self.cache_ttl,
+                    self.max_parallel_requests,
+                    timeout=60,
+                )
+                cov_ranges = [rec for page in pages for rec in page]
+            else:
+                if device_ids is not None:
+                    params["deviceId"] = device_ids[0]
+                fetch = cached_get if sk is not None else cached_iter
+                cov_ranges = fetch(session, url, params, self.cache_ttl, timeout=60)
         except requests.HTTPError as e:
-            body = None
-            try:
-                body = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+            body = e.response.text if e.response is not None else None
             raise RuntimeError(
                 f"foxglove_coverage FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={params})"
             )
-        cov_ranges: list[dict] = r.json()
 
-        # Local sort if requested (API has no sortBy)
-        if sortkeys:
-            sk = sortkeys[0]
-            if sk.attname in self.SUPPORTED_SORT_FIELDS:
-                api_key = {"start_time": "start", "end_time": "end"}.get(sk.attname, sk.attname)
-                cov_ranges.sort(key=lambda d: d.get(api_key) or "", reverse=sk.is_reversed)  # type: ignore
+        # Local sort if requested (API has no sortBy). Use sorted() rather than
+        # .sort() since the list may be shared with the response cache.
+        if sk is not None:
+            # sorted() evaluates key once per record; bind the column's extractor up front
+            get = self.FIELD_EXTRACTORS[sk.attname]
+            cov_ranges = sorted(cov_ranges, key=lambda d: get(d) or "", reverse=sk.is_reversed)
 
+        # Postgres re-applies every qual to the rows we return, so the local
+        # filter is only a prefilter: skip it for quals the request enforces
+        # (time bounds always land in the mandatory start/end params). Under a
+        # `limit` the time quals are re-checked too, so the cap only counts
+        # rows Postgres will keep.
+        residual = [q for q in quals if id(q) not in pushed]
+        compiled = self._compile_quals(residual + time_quals if limit_ else residual)
+        # pseudo columns echo their qual so Postgres' recheck passes
+        extractors = {
+            **self.FIELD_EXTRACTORS,
+            "tolerance": lambda _rec: tolerance,
+            "limit": lambda _rec: limit_,
+        }
+        # Build only the projected columns
+        cols = [c for c in columns if c in extractors]
+        # fields the residual filter reads; computed first so a rejected record
+        # never pays for its other (possibly serialized) projected columns
+        filter_cols = [f for f in {fq[0] for fq in compiled} if f in extractors]
+        if not cols and not filter_cols:
+            # count(*) and the like: no column is projected or filtered on, so
+            # skip row construction and just emit one empty row per record
+            for yielded, _ in enumerate(cov_ranges, 1):
+                yield {}
+                if limit_ and yielded >= limit_:
+                    return
+            return
+        yielded = 0
         for rec in cov_ranges:
-            dev = rec.get("device") or {}
-            row = {
-                "device_id": dev.get("id") or rec.get("deviceId"),
-                "device_name": dev.get("name"),
-                "start_time": rec.get("start"),
-                "end_time": rec.get("end"),
-                "status": rec.get("status"),  # deprecated
-                "import_status": rec.get("importStatus"),
-                "tolerance": tolerance,
-            }
-            if not self._row_matches_quals(row, quals):
-                continue
-            yield {c: row.get(c) for c in columns}
+            if filter_cols:
+                probe = {f: extractors[f](rec) for f in filter_cols}
+                if not self._row_matches_compiled(probe, compiled):
+                    continue
+                row = {c: probe[c] if c in probe else extractors[c](rec) for c in cols}
+            else:
+                row = {c: extractors[c](rec) for c in cols}
+            yield row
+            yielded += 1
+            if limit_ and yielded >= limit_:
+                return  # stop consuming (and downloading) the response early
 
     # ---------- helpers --------------------------------------------------
-    @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
+    @classmethod
+    def _compile_quals(cls, quals: List) -> List[CompiledQual]:
+        """Pre-digest quals into (field, op, str_value, rhs_dt) tuples once per scan.
+
+        Quals the local filter would ignore anyway (unsupported operators or an
+        unparseable timestamp) are dropped here instead of being re-examined per row.
+        """
+        compiled: List[CompiledQual] = []
         for q in quals:
             fn = q.field_name
             op = getattr(q, "operator", "=")
-            if fn not in row:
-                continue
             if op == "=":
-                if str(row[fn]) != str(q.value):
-                    return False
-            elif fn in ("start_time", "end_time") and op in (">", ">=", "<", "<="):
-                lhs = parse_dt(row.get(fn))
+                # timestamps compare parsed (API `...Z` vs. qual `... +00:00`)
+                rhs = parse_dt(q.value) if fn in cls.TIME_FIELDS else None
+                compiled.append((fn, op, str(q.value), rhs))
+            elif fn in cls.TIME_FIELDS and op in RANGE_OPS:
                 rhs = parse_dt(q.value)
-                if lhs is None or rhs is None:
-                    continue
-                if op == ">" and not (lhs > rhs):
-                    return False
-                if op == ">=" and not (lhs >= rhs):
-                    return False
-                if op == "<" and not (lhs < rhs):
+                if rhs is not None:
+                    compiled.append((fn, op, str(q.value), rhs))
+        # Cheapest checks first so a rejected row short-circuits before parse_dt():
+        # equality, then containment, then timestamp ranges (stable otherwise).
+        compiled.sort(
+            key=lambda c: (0 if c[1] == "=" else 1 if c[1] == "@>" else 2, c[0] in cls.TIME_FIELDS)
+        )
+        return compiled
+
+    @staticmethod
+    def _row_matches_compiled(row: Dict[str, Any], compiled: List[CompiledQual]) -> bool:
+        for fn, op, str_value, rhs in compiled:
+            if fn not in row:
+                continue
+            if rhs is None:
+                if str(row[fn]) != str_value:
                     return False
-                if op == "<=" and not (lhs <= rhs):
+                continue
+            lhs = parse_dt(row[fn])
+            if op == "=":
+                if lhs != rhs:
                     return False
+            elif lhs is not None and not RANGE_OPS[op](lhs, rhs):
+                return False
         return True
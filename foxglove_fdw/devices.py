@@ -1,17 +1,33 @@
 """
 Foxglove Devices Foreign Data Wrapper
 Implements a read-only FDW for `GET /v1/devices`
+(`WHERE id = ...` is served by `GET /v1/devices/{id}` instead of the listing)
 """
 
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import List, Dict, Any
+from typing import Callable, Iterable, List, Dict, Any, Tuple
 import requests
-import json
+from urllib.parse import quote
+from .cache import cached_get, cached_iter
+from .http import get_session
+from .utils import json_dumps, parse_option, as_bool
 
 
 class FoxgloveDevicesFDW(ForeignDataWrapper):
     SUPPORTED_SORT_FIELDS = {"id", "name"}  # plus any properties.* key
+    DEFAULT_CACHE_TTL = 30.0  # seconds; device listings change rarely
+    # SQL column -> value from one API device record
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        "id": lambda d: d.get("id"),
+        "name": lambda d: d.get("name"),
+        "org_id": lambda d: d.get("orgId"),
+        "project_id": lambda d: d.get("projectId"),
+        "created_at": lambda d: d.get("createdAt"),
+        "updated_at": lambda d: d.get("updatedAt"),
+        "retain_recordings_seconds": lambda d: d.get("retainRecordingsSeconds"),
+        "properties": lambda d: json_dumps(d.get("properties") or {}),
+    }
 
     """
     Required server options
@@ -23,6 +39,10 @@ class FoxgloveDevicesFDW(ForeignDataWrapper):
     Optional server options
     -----------------------
     base_url  - defaults to https://api.foxglove.dev/v1
+    cache_ttl - seconds to reuse an identical API response (default 30;
+                0 disables the cache)
+    use_http2 - send requests over HTTP/2 via httpx (default false; needs the
+                `http2` extra, otherwise falls back to HTTP/1.1)
     """
 
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
@@ -35,6 +55,10 @@ class FoxgloveDevicesFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        self.cache_ttl = parse_option(options, "cache_ttl", self.DEFAULT_CACHE_TTL, float)
+        self.use_http2 = parse_option(options, "use_http2", False, as_bool)
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url, self.use_http2)
 
     # ---------- Planner helpers ------------------------------------------------
     def get_rel_size(  # pyright: ignore[reportIncompatibleMethodOverride]
@@ -71,19 +95,28 @@ class FoxgloveDevicesFDW(ForeignDataWrapper):
     def execute(  # pyright: ignore[reportIncompatibleMethodOverride]
         self, quals: list, columns: list, sortkeys: list[SortKey] | None = None
     ):
-        params, limit_ = {}, None
+        params: Dict[str, Any] = {}
+        limit_: int | None = None
+        # ids of quals the API request fully enforces; the rest are post-filtered
+        pushed: set[int] = set()
+        point_qual = None  # `id = ...` qual, if any
 
         for q in quals:  # simple equality push‑down
             if q.operator == "=":
                 if q.field_name == "project_id":
                     params["projectId"] = q.value
+                    pushed.add(id(q))
                 elif q.field_name == "name":
+                    # `query` is a search, not an exact match: keep post-filtering
                     params["query"] = q.value
-                elif q.field_name == "id":
-                    # no native filter; we will post‑filter below
-                    pass
+                elif q.field_name == "id" and point_qual is None:
+                    # served by GET /devices/{id} below
+                    point_qual = q
             elif q.field_name == "limit" and q.operator in ("<", "<="):
-                limit_ = q.value
+                try:
+                    limit_ = int(q.value)
+                except (TypeError, ValueError):
+                    pass
 
         if limit_:
             params["limit"] = limit_
@@ -97,52 +130,86 @@ class FoxgloveDevicesFDW(ForeignDataWrapper):
                 params["sortOrder"] = "desc" if primary.is_reversed else "asc"
 
         # ---   REST call   ----------------------------------------------
+        session = self._session
         try:
-            r = requests.get(
-                f"{self.base_url}/devices",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
-                timeout=30,
-            )
-            r.raise_for_status()
+            if point_qual is not None:
+                # point lookup instead of scanning the listing; the listing
+                # params don't apply, so every other qual is checked locally
+                pushed = {id(point_qual)}
+                devices: Iterable[dict] = [
+                    cached_get(
+                        session,
+                        f"{self.base_url}/devices/{quote(str(point_qual.value), safe='')}",
+                        {},
+                        self.cache_ttl,
+                        timeout=30,
+                    )
+                ]
+            else:
+                # stream the response array unless it has to be sorted locally first
+                fetch = cached_get if sortkeys and "sortBy" not in params else cached_iter
+                devices = fetch(
+                    session,
+                    f"{self.base_url}/devices",
+                    params,
+                    self.cache_ttl,
+                    timeout=30,
+                )
         except requests.HTTPError as e:
-            body = None
-            try:
-                body = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+            if point_qual is not None and e.response is not None and e.response.status_code == 404:
+                return  # no such device
+            body = e.response.text if e.response is not None else None
             raise RuntimeError(
                 f"foxglove_devices FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={params})"
             )
-        devices = r.json()
 
         # ---   optional local sort fall‑back   --------------------------
         if sortkeys and "sortBy" not in params:
             # PostgreSQL will sort anyway, but doing it here keeps deterministic
             sk = sortkeys[0]
-            devices.sort(key=lambda d: d.get(sk.attname), reverse=sk.is_reversed)
+            devices = sorted(devices, key=lambda d: d.get(sk.attname), reverse=sk.is_reversed)  # type: ignore
 
         # ---   yield rows   ---------------------------------------------
+        # Postgres re-applies every qual to the rows we return, so the local
+        # filter is only a prefilter: skip it for quals the request enforces.
+        compiled = self._compile_quals([q for q in quals if id(q) not in pushed])
+        # Build only the projected columns
+        extractors = self.FIELD_EXTRACTORS
+        cols = [c for c in columns if c in extractors]
+        # fields the residual filter reads; computed first so a rejected record
+        # never pays for its other (possibly serialized) projected columns
+        filter_cols = [f for f in {fq[0] for fq in compiled} if f in extractors]
+        if not cols and not filter_cols:
+            # count(*) and the like: no column is projected or filtered on, so
+            # skip row construction and just emit one empty row per record
+            for yielded, _ in enumerate(devices, 1):
+                yield {}
+                if limit_ and yielded >= limit_:
+                    return
+            return
+        yielded = 0
         for d in devices:
-            row = {
-                "id": d.get("id"),
-                "name": d.get("name"),
-                "org_id": d.get("orgId"),
-                "project_id": d.get("projectId"),
-                "created_at": d.get("createdAt"),
-                "updated_at": d.get("updatedAt"),
-                "retain_recordings_seconds": d.get("retainRecordingsSeconds"),
-                "properties": json.dumps(d.get("properties", {})),
-            }
-            if not self._row_matches_quals(row, quals):
-                continue
-            yield {c: row.get(c) for c in columns}
+            if filter_cols:
+                probe = {f: extractors[f](d) for f in filter_cols}
+                if not self._row_matches_compiled(probe, compiled):
+                    continue
+                row = {c: probe[c] if c in probe else extractors[c](d) for c in cols}
+            else:
+                row = {c: extractors[c](d) for c in cols}
+            yield row
+            yielded += 1
+            if limit_ and yielded >= limit_:
+                return  # stop consuming (and downloading) the response early
 
     # ---------- helpers --------------------------------------------------------
     @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
-        for q in quals:
-            if q.operator == "=" and q.field_name in row:
-                if str(row[q.field_name]) != str(q.value):
-                    return False
+    def _compile_quals(quals: List) -> List[Tuple[str, str]]:
+        """Reduce quals to (field, str_value) equality pairs once per scan."""
+        return [(q.field_name, str(q.value)) for q in quals if q.operator == "="]
+
+    @staticmethod
+    def _row_matches_compiled(row: Dict[str, Any], compiled: List[Tuple[str, str]]) -> bool:
+        for fn, str_value in compiled:
+            if fn in row and str(row[fn]) != str_value:
+                return False
         return True
@@ -26,14 +26,25 @@ Time range pushdown:
 
 ORDER BY push-down: id, device_id, device_name, start_time, created_at, updated_at.
 Sorting is mapped to the API's sortBy list; device_name maps to deviceName.
+
+Server options:
+  - base_url   defaults to https://api.foxglove.dev/v1
+  - cache_ttl  seconds to reuse an identical API response (default 10; 0 disables)
+  - use_http2  send requests over HTTP/2 via httpx (default false; needs the
+               `http2` extra, otherwise falls back to HTTP/1.1)
 """
 
 from __future__ import annotations
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, Any, List
-import requests, json, datetime as dt
-from .utils import to_iso8601, parse_dt
+from typing import Callable, Dict, Any, Iterable, List, Tuple
+import requests, datetime as dt
+from .cache import cached_get, cached_iter
+from .http import get_session
+from .utils import RANGE_OPS, TimeQualHandler, TimeWindow, json_dumps, json_loads, to_iso8601, parse_dt, parse_option, as_bool
+
+# (field_name, operator, str(value), pre-parsed RHS: datetime for ranges, dict for @>)
+CompiledQual = Tuple[str, str, str, Any]
 
 
 class FoxgloveEventsFDW(ForeignDataWrapper):
@@ -45,6 +56,35 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
         "created_at",  # maps to createdAt
         "updated_at",  # maps to updatedAt
     }
+    DEFAULT_CACHE_TTL = 10.0  # seconds
+    TIME_FIELDS = {"start_time", "end_time", "created_at", "updated_at"}
+    # (field, op) -> how a time qual narrows the API's start/end window
+    TIME_QUAL_HANDLERS: Dict[Tuple[str, str], TimeQualHandler] = {
+        ("start_time", ">"): TimeWindow.raise_lower,
+        ("start_time", ">="): TimeWindow.raise_lower,
+        ("start_time", "="): TimeWindow.pin,
+        ("start_time", "<"): TimeWindow.lower_upper,
+        ("start_time", "<="): TimeWindow.lower_upper,
+        ("end_time", ">"): TimeWindow.raise_lower,
+        ("end_time", ">="): TimeWindow.raise_lower,
+        ("end_time", "="): TimeWindow.lower_upper,
+        ("end_time", "<"): TimeWindow.lower_upper,
+        ("end_time", "<="): TimeWindow.lower_upper,
+    }
+    # SQL column -> value from one API event record
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        "id": lambda e: e.get("id"),
+        "device_id": lambda e: (e.get("device") or {}).get("id") or e.get("deviceId"),
+        "device_name": lambda e: (e.get("device") or {}).get("name"),
+        "start_time": lambda e: e.get("start"),
+        "end_time": lambda e: e.get("end"),
+        "metadata": lambda e: json_dumps(e.get("metadata") or {}),
+        # raw metadata dict for the `@>` prefilter; never projected
+        "_metadata_obj": lambda e: e.get("metadata") or {},
+        "created_at": lambda e: e.get("createdAt"),
+        "updated_at": lambda e: e.get("updatedAt"),
+        "project_id": lambda e: e.get("projectId"),
+    }
 
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
@@ -56,6 +96,10 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        self.cache_ttl = parse_option(options, "cache_ttl", self.DEFAULT_CACHE_TTL, float)
+        self.use_http2 = parse_option(options, "use_http2", False, as_bool)
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url, self.use_http2)
 
     # ---------- planner --------------------------------------------------
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -78,10 +122,11 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
         limit_ = None
         metadata_query_parts: list[str] = []
         # Time pushdown accumulators
-        start_lower: str | None = None  # API param 'start' (lower bound on start)
-        end_upper: str | None = None  # API param 'end'   (upper bound on end)
+        window = TimeWindow()  # API params 'start' (lower bound) / 'end' (upper bound)
         created_after_candidates: list[str] = []  # API supports createdAfter
         updated_after_candidates: list[str] = []  # API supports updatedAfter
+        # ids of quals the API request fully enforces; the rest are post-filtered
+        pushed: set[int] = set()
 
         for q in quals:
             fn = q.field_name
@@ -96,18 +141,10 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
                     md = raw
                 else:
                     try:
-                        md = json.loads(raw)
+                        md = json_loads(raw)
                     except Exception:
                         md = {}
-                for k, v in md.items():
-                    if v is None:
-                        continue
-                    if isinstance(v, (list, tuple, set)):
-                        metadata_query_parts.append(f"{k}:{','.join(str(x) for x in v)}")
-                    elif v == "*":
-                        metadata_query_parts.append(f"{k}:*")
-                    else:
-                        metadata_query_parts.append(f"{k}:{v}")
+                metadata_query_parts.extend(self._md_parts(md))
                 continue
 
             # Pseudo-column filters: metadata_<key> = value
@@ -118,62 +155,56 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
                     metadata_query_parts.append(f"{key}:{','.join(str(x) for x in val)}")
                 else:
                     metadata_query_parts.append(f"{key}:{val}")
+                pushed.add(id(q))
                 continue
 
             # Generic string search in metadata: metadata = 'foo'
             if fn == "metadata" and op == "=" and isinstance(q.value, str):
                 # unstructured token search
                 metadata_query_parts.append(q.value)
+                pushed.add(id(q))
                 continue
 
             # Timestamp pushdown for start/end
-            if fn == "start_time" and op in (">", ">=", "="):
-                iso = to_iso8601(q.value)
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
-                if op == "=":
-                    if end_upper is None or iso < end_upper:
-                        end_upper = iso
-                continue
-            if fn == "start_time" and op in ("<", "<="):
-                iso = to_iso8601(q.value)
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                continue
-            if fn == "end_time" and op in ("<", "<=", "="):
-                iso = to_iso8601(q.value)
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                continue
-            if fn == "end_time" and op in (">", ">="):
-                iso = to_iso8601(q.value)
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
+            handler = self.TIME_QUAL_HANDLERS.get((fn, op))
+            if handler is not None:
+                handler(window, to_iso8601(q.value))
+                pushed.add(id(q))
                 continue
 
-            # created_at/updated_at: push only lower bounds (API supports *After)
+            # created_at/updated_at: push only lower bounds (API supports *After).
+            # Equality only becomes a lower bound, so it stays a residual qual.
             if fn == "created_at" and op in (">", ">=", "="):
                 created_after_candidates.append(to_iso8601(q.value))
+                if op != "=":
+                    pushed.add(id(q))
                 continue
             if fn == "updated_at" and op in (">", ">=", "="):
                 updated_after_candidates.append(to_iso8601(q.value))
+                if op != "=":
+                    pushed.add(id(q))
                 continue
 
             # Standard equality filters
             if op == "=":
                 if fn == "device_id":
                     params["deviceId"] = q.value
+                    pushed.add(id(q))
                 elif fn == "device_name":
                     params["deviceName"] = q.value
+                    pushed.add(id(q))
                 elif fn == "project_id":
                     params["projectId"] = q.value
+                    pushed.add(id(q))
                 elif fn == "limit":
                     limit_ = int(q.value)
+                    pushed.add(id(q))
                 elif fn == "id":
                     # post-filter later
                     pass
 
         # Finalize timestamp params
+        start_lower, end_upper = window.lower, window.upper
         if start_lower and not end_upper:
             end_upper = to_iso8601(dt.datetime.now(dt.timezone.utc))
         if end_upper and not start_lower:
@@ -207,102 +238,146 @@ class FoxgloveEventsFDW(ForeignDataWrapper):
                 params["sortBy"] = api_field
                 params["sortOrder"] = "desc" if sk.is_reversed else "asc"
 
+        session = self._session
         try:
-            r = requests.get(
+            # Stream the response array unless it has to be sorted locally first
+            fetch = cached_get if sortkeys and "sortBy" not in params else cached_iter
+            events: Iterable[dict] = fetch(
+                session,
                 f"{self.base_url}/events",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
+                params,
+                self.cache_ttl,
                 timeout=60,
             )
-            r.raise_for_status()
         except requests.HTTPError as http_err:
-            body = None
-            try:
-                body = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+            body = http_err.response.text if http_err.response is not None else None
             raise RuntimeError(
                 f"foxglove_events FDW upstream error {http_err.response.status_code if http_err.response else ''}: {body} (params={params})"
             )
-        events: list[dict] = r.json()
 
         if sortkeys and "sortBy" not in params:
             sk = sortkeys[0]
-            api_key = {
-                "device_id": "deviceId",
-                "device_name": "deviceName",
-                "start_time": "start",
-                "created_at": "createdAt",
-                "updated_at": "updatedAt",
-            }.get(sk.attname, sk.attname)
-            events.sort(key=lambda d, k=api_key: str(d.get(k) or ""), reverse=sk.is_reversed)  # type: ignore
+            # sorted() evaluates key once per event; bind the column's extractor up
+            # front (this also sees device ids nested under "device")
+            attname = sk.attname
+            get: Callable[[Dict[str, Any]], Any] = self.FIELD_EXTRACTORS.get(attname) or (
+                lambda d: d.get(attname)
+            )
+            events = sorted(events, key=lambda d: str(get(d) or ""), reverse=sk.is_reversed)
 
+        # Postgres re-applies every qual to the rows we return, so the local
+        # filter is only a prefilter: skip it for quals the request enforces.
+        compiled = self._compile_quals([q for q in quals if id(q) not in pushed])
+        # Build only the projected columns
+        extractors = self.FIELD_EXTRACTORS
+        cols = [c for c in columns if c in extractors]
+        # fields the residual filter reads; computed first so a rejected record
+        # never pays for its other (possibly serialized) projected columns
+        filter_cols = [f for f in {fq[0] for fq in compiled} if f in extractors]
+        if not cols and not filter_cols:
+            # count(*) and the like: no column is projected or filtered on, so
+            # skip row construction and just emit one empty row per record
+            for yielded, _ in enumerate(events, 1):
+                yield {}
+                if limit_ and yielded >= limit_:
+                    return
+            return
+        yielded = 0
         for e in events:
-            dev = e.get("device") or {}
-            row = {
-                "id": e.get("id"),
-                "device_id": dev.get("id") or e.get("deviceId"),
-                "device_name": dev.get("name"),
-                "start_time": e.get("start"),
-                "end_time": e.get("end"),
-                "metadata": json.dumps(e.get("metadata", {})),
-                "created_at": e.get("createdAt"),
-                "updated_at": e.get("updatedAt"),
-                "project_id": e.get("projectId"),
-            }
-            if not self._row_matches_quals(row, quals):
-                continue
-            yield {c: row.get(c) for c in columns}
+            if filter_cols:
+                probe = {f: extractors[f](e) for f in filter_cols}
+                if not self._row_matches_compiled(probe, compiled):
+                    continue
+                row = {c: probe[c] if c in probe else extractors[c](e) for c in cols}
+            else:
+                row = {c: extractors[c](e) for c in cols}
+            yield row
+            yielded += 1
+            if limit_ and yielded >= limit_:
+                return  # stop consuming (and downloading) the response early
 
     # ---------- helpers --------------------------------------------------
-    @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
+    @classmethod
+    def _compile_quals(cls, quals: List) -> List[CompiledQual]:
+        """Pre-digest quals into (field, op, str_value, rhs) tuples once per scan.
 
+        Timestamp RHS values and `metadata @>` documents are parsed here so the
+        per-row matcher never re-parses them; quals it would ignore are dropped.
+        `metadata @>` is retargeted at the raw `_metadata_obj` dict, so rows are
+        matched without a dumps/loads round trip.
+        """
+        compiled: List[CompiledQual] = []
         for q in quals:
             fn, op = q.field_name, q.operator
-            if op == "=" and fn in row:
-                if str(row[fn]) != str(q.value):
-                    return False
+            if op == "=":
+                # timestamps compare parsed (API `...Z` vs. qual `... +00:00`)
+                rhs = parse_dt(q.value) if fn in cls.TIME_FIELDS else None
+                compiled.append((fn, op, str(q.value), rhs))
             elif fn == "metadata" and op == "@>":
-                # local containment check for consistency
                 try:
-                    want = q.value if isinstance(q.value, dict) else json.loads(q.value)
+                    want = q.value if isinstance(q.value, dict) else json_loads(q.value)
                 except Exception:
                     continue
                 if isinstance(want, dict):
-                    try:
-                        current = row.get("metadata")
-                        cur_obj = current if isinstance(current, dict) else json.loads(current)  # type: ignore
-                    except Exception:
-                        return False
-                    for k, v in want.items():
-                        if k not in cur_obj:
-                            return False
-                        cv = cur_obj[k]
-                        if isinstance(v, (list, tuple, set)):
-                            if cv not in v:
-                                return False
-                        elif v == "*":
-                            continue
-                        else:
-                            if str(cv) != str(v):
-                                return False
-            elif fn in ("start_time", "end_time", "created_at", "updated_at") and op in (
-                ">",
-                ">=",
-                "<",
-                "<=",
-            ):
-                lhs = parse_dt(row.get(fn))
+                    compiled.append(("_metadata_obj", op, str(q.value), want))
+            elif fn in cls.TIME_FIELDS and op in RANGE_OPS:
                 rhs = parse_dt(q.value)
-                if lhs is None or rhs is None:
+                if rhs is not None:
+                    compiled.append((fn, op, str(q.value), rhs))
+        # Cheapest checks first so a rejected row short-circuits before parse_dt():
+        # equality, then containment, then timestamp ranges (stable otherwise).
+        compiled.sort(
+            key=lambda c: (0 if c[1] == "=" else 1 if c[1] == "@>" else 2, c[0] in cls.TIME_FIELDS)
+        )
+        return compiled
+
+    @staticmethod
+    def _row_matches_compiled(row: Dict[str, Any], compiled: List[CompiledQual]) -> bool:
+        for fn, op, str_value, rhs in compiled:
+            if op == "=":
+                if fn not in row:
                     continue
-                if op == ">" and not (lhs > rhs):
+                if rhs is not None:
+                    if parse_dt(row[fn]) != rhs:
+                        return False
+                elif str(row[fn]) != str_value:
                     return False
-                if op == ">=" and not (lhs >= rhs):
+            elif op == "@>":
+                if not FoxgloveEventsFDW._metadata_contains(row[fn], rhs):
                     return False
-                if op == "<" and not (lhs < rhs):
+            else:
+                lhs = parse_dt(row.get(fn))
+                if lhs is not None and not RANGE_OPS[op](lhs, rhs):
                     return False
-                if op == "<=" and not (lhs <= rhs):
+        return True
+
+    @staticmethod
+    def _md_parts(md: Dict[str, Any]) -> List[str]:
+        """Render a `metadata @>` document as API query terms (`k:v`, `k:v1,v2`, `k:*`)."""
+        parts: List[str] = []
+        for k, v in md.items():
+            if v is None:
+                continue
+            t = type(v)
+            if t is list or t is tuple or t is set:
+                parts.append(f"{k}:{','.join(map(str, v))}")
+            else:
+                # "*" (presence) renders as k:* like any other scalar
+                parts.append(f"{k}:{v}")
+        return parts
+
+    @staticmethod
+    def _metadata_contains(cur_obj: Any, want: Dict[str, Any]) -> bool:
+        """Local `metadata @> want` check; list values match any, "*" matches presence."""
+        for k, v in want.items():
+            if k not in cur_obj:
+                return False
+            cv = cur_obj[k]
+            if isinstance(v, (list, tuple, set)):
+                if cv not in v:
                     return False
+            elif v == "*":
+                continue
+            elif cv != v:
+                return False
         return True
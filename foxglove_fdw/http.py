@@ -0,0 +1,265 @@
+"""
+Shared HTTP plumbing for foxglove_fdw.
+
+Multicorn keeps one Python interpreter alive per Postgres backend, so a pooled
+`requests.Session` lets consecutive scans reuse keep-alive TCP+TLS connections
+to the Foxglove API instead of paying a fresh handshake on every query.
+
+Currently exposes:
+  - get_session(api_key, base_url, http2=False): lazily-built, process-wide
+    session with the Authorization and User-Agent headers bound once,
+    zstd/gzip response compression requested, and GETs retried with backoff
+    on 429 and transient 5xx responses. With http2=True (and the optional
+    `httpx[http2]` extra installed) requests are sent through an httpx.Client
+    instead, so concurrent calls multiplex over one HTTP/2 connection per host.
+  - JSON_HEADERS: per-request headers for the JSON API endpoints
+"""
+
+from __future__ import annotations
+from multicorn.utils import log_to_postgres, WARNING
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Dict, Iterator, Optional, Tuple
+import os
+import ssl
+import threading
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # optional: pip install "foxglove-fdw[http2]"
+    httpx = None  # type: ignore[assignment]
+
+POOL_CONNECTIONS = 10  # number of distinct hosts kept in the pool
+POOL_MAXSIZE = 50  # connections kept alive per host
+HTTP2_MAX_KEEPALIVE = 20
+HTTP2_MAX_CONNECTIONS = 100
+# longest Retry-After (seconds) honored between retries; a server asking for
+# more would otherwise park the backend far past the 30-60 s request timeouts
+RETRY_AFTER_MAX = 5.0
+
+# Only advertise codings urllib3 can undo here (zstd/br depend on zstandard /
+# brotli being importable), listing zstd first since it decodes fastest.
+_CODINGS = ACCEPT_ENCODING.split(",")
+ACCEPT_ENCODING_HEADER = ", ".join(sorted(_CODINGS, key=lambda c: c != "zstd"))
+
+try:
+    _VERSION = version("foxglove-fdw")
+except PackageNotFoundError:  # running from a source checkout
+    _VERSION = "dev"
+# identify the FDW to the API (keeping the requests token for its operators)
+USER_AGENT = f"foxglove-fdw/{_VERSION} {requests.utils.default_user_agent()}"
+
+# per-request headers for the JSON API endpoints (not the pre-signed MCAP
+# download, which shares the session machinery)
+JSON_HEADERS = {"Accept": "application/json"}
+
+_sessions: Dict[Tuple[Optional[str], str, bool], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(api_key: Optional[str], base_url: str, http2: bool = False) -> requests.Session:
+    """Return the shared session for (api_key, base_url), creating it on first use.
+
+    Sessions are keyed on the credentials so that a rotated key (or a second
+    foreign server pointing at another deployment) never reuses a session
+    carrying stale headers. Callers always get a requests.Session, so
+    HTTPError handling and streaming work the same whichever transport
+    carries the request.
+    """
+    key = (api_key, base_url, http2)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _new_session(api_key, http2)
+            _sessions[key] = session
+    return session
+
+
+def _new_session(api_key: Optional[str], http2: bool = False) -> requests.Session:
+    session = requests.Session()
+    # bound once here, so individual calls never rebuild auth/identity headers
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING_HEADER
+    session.headers["User-Agent"] = USER_AGENT
+    if api_key:
+        session.headers.update({"Authorization": f"Bearer {api_key}"})
+    if http2:
+        h2_adapter = _httpx_adapter()
+        if h2_adapter is not None:
+            session.mount("https://", h2_adapter)
+            session.mount("http://", h2_adapter)
+            return session
+    retry = _CappedRetry(
+        total=3,
+        backoff_factor=0.3,
+        # 429/503 honor Retry-After, clamped to RETRY_AFTER_MAX per attempt
+        status_forcelist=[429, 502, 503, 504],
+        # only idempotent reads; POST /data/stream is never replayed
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # hand the final response back so callers still see an HTTPError with a body
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _CappedRetry(Retry):
+    """Retry that never sleeps longer than RETRY_AFTER_MAX on a Retry-After."""
+
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_AFTER_MAX)
+
+
+def _httpx_adapter() -> Optional["HTTPXAdapter"]:
+    if httpx is None:
+        log_to_postgres(
+            "foxglove_fdw: `use_http2` requires the httpx[http2] extra; falling back to HTTP/1.1",
+            level=WARNING,
+        )
+        return None
+    # the CA bundle requests would pick up from the environment (and pass to
+    # send() as `verify`); the transport's TLS context is fixed at build time
+    ca_bundle = os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get("CURL_CA_BUNDLE")
+    verify: Any = True
+    if ca_bundle:
+        if os.path.isdir(ca_bundle):
+            verify = ssl.create_default_context(capath=ca_bundle)
+        else:
+            verify = ssl.create_default_context(cafile=ca_bundle)
+    try:
+        # the Client ignores its own http2/limits once a transport is given,
+        # so the pool is configured on the transport itself
+        client = httpx.Client(
+            transport=httpx.HTTPTransport(
+                verify=verify,
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=HTTP2_MAX_KEEPALIVE,
+                    max_connections=HTTP2_MAX_CONNECTIONS,
+                ),
+                # connection failures only; httpx has no status-based retries
+                retries=3,
+            ),
+        )
+    except ImportError:  # httpx installed without the h2 package
+        log_to_postgres(
+            "foxglove_fdw: `use_http2` requires the h2 package; falling back to HTTP/1.1",
+            level=WARNING,
+        )
+        return None
+    return HTTPXAdapter(client, ca_bundle)
+
+
+class HTTPXAdapter(BaseAdapter):
+    """requests transport adapter that sends requests through an httpx.Client.
+
+    Responses are always opened in streaming mode and exposed to requests via
+    a file-like `raw`, so `stream=True` consumers (ijson) read bytes as they
+    arrive and everything else gets an eagerly-read body, as with HTTPAdapter.
+
+    TLS verification and proxying are fixed when the client is built: the
+    system CA bundle, or REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE as requests would
+    use, and no proxy. Any other per-request `verify`, a client `cert` or
+    `proxies` (e.g. HTTPS_PROXY) are not supported and are ignored with a
+    one-time warning.
+    """
+
+    def __init__(self, client: "httpx.Client", ca_bundle: Optional[str] = None) -> None:
+        super().__init__()
+        self._client = client
+        self._ca_bundle = ca_bundle
+        self._warned = False
+
+    def send(  # type: ignore[override]
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Any = None,
+        verify: Any = True,
+        cert: Any = None,
+        proxies: Any = None,
+    ) -> requests.Response:
+        if not self._warned and (
+            (verify is not True and verify != self._ca_bundle) or cert is not None
+            or any(v for k, v in (proxies or {}).items() if k != "no_proxy")
+        ):
+            self._warned = True
+            log_to_postgres(
+                "foxglove_fdw: `use_http2` ignores custom TLS verify/cert and proxy settings",
+                level=WARNING,
+            )
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        req = self._client.build_request(
+            request.method or "GET",
+            request.url or "",
+            headers=dict(request.headers),
+            content=request.body,
+            timeout=timeout,
+        )
+        try:
+            resp = self._client.send(req, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        r = requests.Response()
+        r.status_code = resp.status_code
+        r.headers = CaseInsensitiveDict(resp.headers.items())
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.reason = resp.reason_phrase
+        r.url = request.url or ""
+        r.request = request
+        r.connection = self  # type: ignore[assignment]
+        r.raw = _HTTPXBody(resp)
+        if not stream:
+            r.content  # read the body now so the connection is released
+        return r
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class _HTTPXBody:
+    """Minimal file-like view over a streaming httpx response (already decoded)."""
+
+    def __init__(self, resp: "httpx.Response") -> None:
+        self._resp = resp
+        self._chunks: Iterator[bytes] = resp.iter_bytes()
+        # unread bytes are self._buf[self._pos:]; consumed bytes are dropped
+        # only when the buffer is refilled, so small reads never copy the tail
+        self._buf = bytearray()
+        self._pos = 0
+        self.decode_content = True  # httpx undoes Content-Encoding itself
+
+    def read(self, n: int = -1) -> bytes:
+        while n < 0 or len(self._buf) - self._pos < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            if self._pos:
+                del self._buf[: self._pos]
+                self._pos = 0
+            self._buf += chunk
+        end = len(self._buf) if n < 0 else min(self._pos + n, len(self._buf))
+        out = bytes(self._buf[self._pos:end])
+        self._pos = end
+        return out
+
+    def close(self) -> None:
+        self._resp.close()
@@ -27,6 +27,7 @@ Exposed columns:
 
 Push-down filters:
     Equality: device_id, device_name, recording_id, recording_key, topic, limit
+    List: `topic IN (...)` => body.topics (intersected with any topic equality)
     Timestamp range (column: timestamp):
             - `timestamp > / >= value`   => body.start (choose latest lower bound)
             - `timestamp < / <= value`   => body.end   (choose earliest upper bound)
@@ -44,8 +45,9 @@ Source selection rules:
 
 Decoding:
     When schema.encoding == 'protobuf', each message is decoded via
-    mcap_protobuf Decoder into a Python object and JSON-serialized. On decode
-    failure a sentinel object is returned: {"_error": str}.
+    mcap_protobuf Decoder and rendered straight to JSON text with MessageToJson
+    (no intermediate dict). On decode failure a sentinel object is returned:
+    {"_error": str}.
     When schema.encoding == 'json', the bytes are parsed as UTF-8 JSON.
     Any unsupported encoding causes `message` to be NULL.
 
@@ -57,25 +59,108 @@ Limit handling:
 Ordering:
     No ORDER BY push-down is currently implemented; rows follow MCAP file order.
 
+Server options:
+    base_url        defaults to https://api.foxglove.dev/v1
+    link_cache_ttl  seconds to reuse the signed download link for an identical
+                    request body (default 240, inside the link's ~5 minute
+                    expiry; 0 disables). Re-runs skip the /data/stream round trip
+                    but still download the MCAP.
+    decode_workers  threads decoding `message` payloads ahead of the row being
+                    emitted, overlapping decode with the download/MCAP parse
+                    (default 1 = decode inline). Protobuf-to-JSON rendering is
+                    mostly Python code holding the GIL, so this only pays off
+                    when the download, not the decode, is the bottleneck.
+
 Notes / Caveats:
-    - This implementation buffers the entire MCAP stream in memory before iterating
-        (simple but not optimal for very large recordings). Future improvement could
-        parse incrementally.
+    - The MCAP stream is parsed incrementally straight off the HTTP response, so
+        rows are emitted while the download is still in progress and memory use
+        stays bounded by a single record rather than the whole recording.
 """
 
 from __future__ import annotations
-from .utils import to_iso8601
-from google.protobuf.json_format import MessageToDict
-from mcap_protobuf.decoder import Decoder as ProtobufDecoder
+from .cache import cached_post
+from .http import get_session
+from .utils import TimeQualHandler, TimeWindow, json_dumps, json_loads, ns_to_iso8601, to_iso8601, parse_option
+from google.protobuf.json_format import MessageToJson
+from mcap_protobuf.decoder import DecoderFactory as ProtobufDecoderFactory
 from mcap.reader import make_reader
 from mcap.records import Channel, Schema, Message
+from mcap.well_known import MessageEncoding
 from multicorn import ForeignDataWrapper
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, Any, List, Optional
-import requests, json, datetime as dt, io
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Any, Iterator, List, Optional, Tuple
+import requests, datetime as dt, re, threading
+
+# decodes kept in flight ahead of the row being yielded when decode_workers > 1
+DECODE_QUEUE_DEPTH = 32
+
+# A JSON `\u0000` escape that is not itself escaped (preceded by an even number
+# of backslashes). Postgres jsonb rejects U+0000 even in escaped form.
+_NUL_ESCAPE = re.compile(r"(?<!\\)((?:\\\\)*)\\u0000")
+
+
+class _ProtobufDecoder:
+    """Per-scan protobuf decoder that resolves each schema's message class once.
+
+    The descriptor pool is built on first sight of a schema id; every later
+    message on that schema is a single ParseFromString on the cached class.
+    Safe to share between decode_workers threads.
+    """
+
+    def __init__(self, factory: ProtobufDecoderFactory) -> None:
+        self._factory = factory
+        self._by_schema: Dict[int, Callable[[bytes], Any]] = {}
+        self._lock = threading.Lock()
+
+    def decode(self, schema: Schema, data: bytes) -> Any:
+        fn = self._by_schema.get(schema.id)
+        if fn is None:
+            with self._lock:
+                fn = self._by_schema.get(schema.id)
+                if fn is None:
+                    fn = self._factory.decoder_for(MessageEncoding.Protobuf, schema)
+                    if fn is None:
+                        raise ValueError(f"no protobuf decoder for schema {schema.name!r}")
+                    self._by_schema[schema.id] = fn
+        return fn(data)
 
 
 class FoxgloveMessagesFDW(ForeignDataWrapper):
+    DEFAULT_LINK_CACHE_TTL = 240.0  # seconds; signed links expire after ~5 minutes
+    DEFAULT_DECODE_WORKERS = 1
+    # equality quals that select the stream source: SQL column -> body field
+    EQ_PUSHDOWN = {
+        "device_id": "deviceId",
+        "device_name": "deviceName",
+        "recording_id": "recordingId",
+        "recording_key": "recordingKey",
+    }
+    # (field, op) -> how a timestamp qual narrows the body's start/end window
+    TIME_QUAL_HANDLERS: Dict[Tuple[str, str], TimeQualHandler] = {
+        ("timestamp", ">"): TimeWindow.raise_lower,
+        ("timestamp", ">="): TimeWindow.raise_lower,
+        ("timestamp", "="): TimeWindow.pin,
+        ("timestamp", "<"): TimeWindow.lower_upper,
+        ("timestamp", "<="): TimeWindow.lower_upper,
+    }
+    # SQL column -> value from (request body, schema, channel, message); the
+    # decoded `message` payload is produced separately, only when selected
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any], Optional[Schema], Channel, Message], Any]] = {
+        "device_id": lambda body, schema, channel, message: body.get("deviceId"),
+        "device_name": lambda body, schema, channel, message: body.get("deviceName"),
+        "recording_id": lambda body, schema, channel, message: body.get("recordingId"),
+        "recording_key": lambda body, schema, channel, message: body.get("recordingKey"),
+        "timestamp": lambda body, schema, channel, message: ns_to_iso8601(message.log_time),
+        "topic": lambda body, schema, channel, message: channel.topic,
+        "schema_name": lambda body, schema, channel, message: schema.name if isinstance(schema, Schema) else None,
+        "channel_id": lambda body, schema, channel, message: channel.id,
+        "schema_id": lambda body, schema, channel, message: channel.schema_id,
+        "sequence_id": lambda body, schema, channel, message: getattr(message, "sequence", 0),
+        "encoding": lambda body, schema, channel, message: schema.encoding if isinstance(schema, Schema) else None,
+    }
+
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
         self.columns = columns
@@ -85,6 +170,16 @@ class FoxgloveMessagesFDW(ForeignDataWrapper):
             log_to_postgres(
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required", level=WARNING
             )
+        self.link_cache_ttl = parse_option(
+            options, "link_cache_ttl", self.DEFAULT_LINK_CACHE_TTL, float
+        )
+        self.decode_workers = parse_option(
+            options, "decode_workers", self.DEFAULT_DECODE_WORKERS, int
+        )
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url)
+        # the stream link is pre-signed: fetch it without our credentials
+        self._download_session = get_session(None, self.base_url)
 
     # Conservative size estimates (messages unknown); planner just needs something.
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -93,53 +188,41 @@ class FoxgloveMessagesFDW(ForeignDataWrapper):
     def execute(self, quals: List, columns: List, sortkeys=None):  # type: ignore[override]
         body: Dict[str, Any] = {"outputFormat": "mcap"}
 
-        device_id = device_name = recording_id = recording_key = None
-        start_candidate: Optional[str] = None
-        end_candidate: Optional[str] = None
-        topic_filters: List[str] = []
+        source: Dict[str, Any] = {}  # API source-selection fields (deviceId, recordingId, ...)
+        window = TimeWindow()
+        topics: Optional[List[str]] = None  # None = no topic qual seen
         limit_messages: Optional[int] = None
 
         for q in quals:
             fn, op = q.field_name, getattr(q, "operator", "=")
-            if fn == "timestamp":
-                if op in (">", ">="):
-                    iso = to_iso8601(q.value)
-                    if start_candidate is None or iso > start_candidate:
-                        start_candidate = iso
-                elif op in ("<", "<="):
-                    iso = to_iso8601(q.value)
-                    if end_candidate is None or iso < end_candidate:
-                        end_candidate = iso
-                elif op == "=":
-                    iso = to_iso8601(q.value)
-                    start_candidate = iso
-                    end_candidate = iso
+            handler = self.TIME_QUAL_HANDLERS.get((fn, op))
+            if handler is not None:
+                handler(window, to_iso8601(q.value))
+                continue
+            # topic IN (...) arrives as one ScalarArrayOp qual: operator ("=", True)
+            if fn == "topic" and op == ("=", True) and isinstance(q.value, (list, tuple)):
+                topics = self._narrow_topics(topics, q.value)
                 continue
             if op != "=":
                 continue
-            if fn == "device_id":
-                device_id = q.value
-            elif fn == "device_name":
-                device_name = q.value
-            elif fn == "recording_id":
-                recording_id = q.value
-            elif fn == "recording_key":
-                recording_key = q.value
+            api_field = self.EQ_PUSHDOWN.get(fn)
+            if api_field is not None:
+                source[api_field] = q.value
             elif fn == "topic":
-                topic_filters.append(q.value)
+                topics = self._narrow_topics(topics, [q.value])
             elif fn == "limit":
                 try:
                     limit_messages = int(q.value)
                 except Exception:
                     pass
 
-        if start_candidate:
-            body["start"] = start_candidate
-        if end_candidate:
-            body["end"] = end_candidate
+        if window.lower:
+            body["start"] = window.lower
+        if window.upper:
+            body["end"] = window.upper
 
-        if not recording_id and not recording_key:
-            if not (device_id or device_name):
+        if not source.get("recordingId") and not source.get("recordingKey"):
+            if not (source.get("deviceId") or source.get("deviceName")):
                 raise RuntimeError(
                     "foxglove_messages FDW: provide recording_id/recording_key OR (device_id/device_name plus timestamp range)"
                 )
@@ -148,122 +231,168 @@ class FoxgloveMessagesFDW(ForeignDataWrapper):
             if "end" in body and "start" not in body:
                 body["start"] = "1970-01-01T00:00:00Z"
 
-        if device_id:
-            body["deviceId"] = device_id
-        if device_name:
-            body["deviceName"] = device_name
-        if recording_id:
-            body["recordingId"] = recording_id
-        if recording_key:
-            body["recordingKey"] = recording_key
+        if topics is not None and not topics:
+            return  # contradictory topic quals (e.g. topic = 'a' AND topic = 'b')
+        topic_filters = topics or []
+
+        body.update((k, v) for k, v in source.items() if v)
         if topic_filters:
             body["topics"] = topic_filters
 
         link = self._obtain_stream_link(body)
+        r = self._download_session.get(link, timeout=300, stream=True)
         try:
-            r = requests.get(link, timeout=300)
             r.raise_for_status()
-            buf = io.BytesIO(r.content)
         except requests.HTTPError as e:
+            r.close()
             raise RuntimeError(
                 f"foxglove_messages FDW download error {e.response.status_code if e.response else ''}"
             )
+        try:
+            yield from self._iter_rows(r, body, columns, topic_filters, limit_messages)
+        finally:
+            r.close()  # also runs when Postgres stops early (LIMIT), dropping the download
 
+    def _iter_rows(
+        self,
+        r: requests.Response,
+        body: Dict[str, Any],
+        columns: List,
+        topic_filters: List[str],
+        limit_messages: Optional[int],
+    ):
         emitted = 0  # count rows for enforcing limit
-        decoder = ProtobufDecoder()
-        reader = make_reader(buf)
-        for schema, channel, message in reader.iter_messages():  # type: ignore
-            if not isinstance(channel, Channel) or not isinstance(message, Message):
+        decoder = _ProtobufDecoder(ProtobufDecoderFactory())
+        r.raw.decode_content = True  # undo any Content-Encoding while reading
+        # Non-seekable input gives a streaming reader; log_time_order=False keeps it
+        # from buffering every message to sort them (rows follow file order).
+        reader = make_reader(r.raw)  # type: ignore[arg-type]
+        # The API already narrows to body["topics"]; letting the reader drop any
+        # other channel skips those messages before they reach Python row code.
+        messages = reader.iter_messages(topics=topic_filters or None, log_time_order=False)
+        # Build only the projected columns. Decoding is by far the costliest
+        # per-row step, so it only happens when `message` is selected (not for
+        # count(*), GROUP BY topic, ...).
+        extractors = self.FIELD_EXTRACTORS
+        names = [c for c in columns if c in extractors]
+        getters = [extractors[c] for c in names]
+        decode_message = "message" in columns
+        if decode_message and self.decode_workers > 1:
+            yield from self._iter_rows_pooled(messages, body, names, getters, decoder, limit_messages)
+            return
+        if decode_message:
+            decode = self._decode
+            names.append("message")
+            # already a JSON document (str) or None
+            getters.append(lambda body, schema, channel, message: decode(schema, channel, message, decoder))
+        # local binds: the loop below runs once per MCAP message, so skip the
+        # global/attribute lookups on every iteration
+        _isinstance, _Channel, _Message, _dict, _zip = isinstance, Channel, Message, dict, zip
+        for schema, channel, message in messages:  # type: ignore
+            if not _isinstance(channel, _Channel) or not _isinstance(message, _Message):
                 continue
-            if topic_filters and channel.topic not in topic_filters:
-                continue
-            msg_obj = self._decode(schema, channel, message, decoder)
+            # zip over a fixed column order: no per-row key lookups or tuple unpacking
+            row = _dict(_zip(names, [g(body, schema, channel, message) for g in getters]))
             emitted += 1
-            encoding = schema.encoding if isinstance(schema, Schema) else None
-            row = {
-                "device_id": body.get("deviceId"),
-                "device_name": body.get("deviceName"),
-                "recording_id": body.get("recordingId"),
-                "recording_key": body.get("recordingKey"),
-                "timestamp": dt.datetime.fromtimestamp(message.log_time / 1e9, tz=dt.timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z"),
-                "topic": channel.topic,
-                "schema_name": schema.name if isinstance(schema, Schema) else None,
-                "channel_id": channel.id,
-                "schema_id": channel.schema_id,
-                "sequence_id": getattr(message, "sequence", 0),
-                "encoding": encoding,
-                # msg_obj already a Python JSON-able object or None
-                "message": json.dumps(msg_obj) if msg_obj is not None else None,
-            }
-            yield {c: row.get(c) for c in columns}
+            yield row
             if limit_messages and emitted >= limit_messages:
                 break
 
+    def _iter_rows_pooled(
+        self,
+        messages: Iterator,
+        body: Dict[str, Any],
+        names: List[str],
+        getters: List[Callable],
+        decoder: _ProtobufDecoder,
+        limit_messages: Optional[int],
+    ) -> Iterator[Dict[str, Any]]:
+        """Like the inline loop in _iter_rows, but `message` is decoded on a thread pool.
+
+        Up to DECODE_QUEUE_DEPTH decodes run ahead of the row being yielded;
+        rows still come out in MCAP file order.
+        """
+        pending: Deque[Tuple[Dict[str, Any], Future]] = deque()
+        submitted = 0
+        pool = ThreadPoolExecutor(max_workers=self.decode_workers)
+        try:
+            for schema, channel, message in messages:  # type: ignore
+                if not isinstance(channel, Channel) or not isinstance(message, Message):
+                    continue
+                row = dict(zip(names, [g(body, schema, channel, message) for g in getters]))
+                pending.append((row, pool.submit(self._decode, schema, channel, message, decoder)))
+                submitted += 1
+                if len(pending) >= DECODE_QUEUE_DEPTH:
+                    row, fut = pending.popleft()
+                    row["message"] = fut.result()
+                    yield row
+                # never decode past the limit
+                if limit_messages and submitted >= limit_messages:
+                    break
+            while pending:
+                row, fut = pending.popleft()
+                row["message"] = fut.result()
+                yield row
+        finally:
+            # a scan stopped early (LIMIT, error) drops the queued decodes
+            pool.shutdown(wait=True, cancel_futures=True)
+
     # ----- helpers -----------------------------------------------------------
+    @staticmethod
+    def _narrow_topics(current: Optional[List[str]], values) -> List[str]:
+        """AND another topic qual into the pushed topic list, keeping first-seen order."""
+        if current is None:
+            return list(dict.fromkeys(values))
+        allowed = set(values)
+        return [t for t in current if t in allowed]
+
     def _obtain_stream_link(self, body: Dict[str, Any]) -> str:
         try:
-            r = requests.post(
-                f"{self.base_url}/data/stream",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=body,
-                timeout=60,
+            data = cached_post(
+                self._session, f"{self.base_url}/data/stream", body, self.link_cache_ttl, timeout=60
             )
-            r.raise_for_status()
-            data = r.json()
             link = data.get("link")
             if not link:
                 raise RuntimeError("foxglove_messages FDW: stream response missing link")
             return link
         except requests.HTTPError as e:
-            body_txt = None
-            try:
-                body_txt = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+            body_txt = e.response.text if e.response is not None else None
             raise RuntimeError(
                 f"foxglove_messages FDW upstream error {e.response.status_code if e.response else ''}: {body_txt} (body={body})"
             )
 
     # Protobuf decoding helper
     @staticmethod
-    def _decode(schema: Schema | None, channel: Channel, message: Message, decoder: ProtobufDecoder):  # type: ignore[name-defined]
+    def _decode(schema: Schema | None, channel: Channel, message: Message, decoder: _ProtobufDecoder) -> Optional[str]:
+        """Return the message payload as a JSON document string, or None if undecodable."""
         if schema and schema.encoding == "protobuf":
             try:
-                decoded = decoder.decode(schema, message)
-                as_dict = MessageToDict(
+                decoded = decoder.decode(schema, message.data)
+                json_str = MessageToJson(
                     decoded,
                     preserving_proto_field_name=True,
                     always_print_fields_with_no_presence=True,
+                    indent=None,
+                    ensure_ascii=False,
                 )
-                return FoxgloveMessagesFDW._sanitize_json(as_dict)
+                return FoxgloveMessagesFDW._strip_nul(json_str)
             except Exception as e:  # pragma: no cover
-                return {"_error": f"protobuf_decode_failed: {e}"}
+                return json_dumps({"_error": f"protobuf_decode_failed: {e}"})
         if schema and schema.encoding == "json":
             try:
-                parsed = json.loads(message.data.decode("utf-8"))
-                return FoxgloveMessagesFDW._sanitize_json(parsed)
+                # orjson parses the UTF-8 bytes directly (no str decode)
+                parsed = json_loads(message.data.translate(None, b"\x00"))
+                return FoxgloveMessagesFDW._strip_nul(json_dumps(parsed))
             except Exception as e:  # pragma: no cover
-                return {"_error": f"json_decode_failed: {e}"}
+                return json_dumps({"_error": f"json_decode_failed: {e}"})
         # Unsupported encoding: return None to map to SQL NULL
         return None
 
     @staticmethod
-    def _sanitize_json(value: Any) -> Any:
-        """Recursively remove / replace characters Postgres JSONB cannot accept.
-
-        Postgres rejects the Unicode code point U+0000 (NUL) even when escaped
-        (\u0000) inside JSON input. We strip those to prevent 22P05 errors.
-        """
-        if isinstance(value, str):
-            # If the string contains the NUL codepoint, remove it; otherwise return unchanged.
-            return value.replace("\x00", "") if "\x00" in value else value
-        if isinstance(value, list):
-            return [FoxgloveMessagesFDW._sanitize_json(v) for v in value]
-        if isinstance(value, dict):
-            return {k: FoxgloveMessagesFDW._sanitize_json(v) for k, v in value.items()}
-        return value
+    def _strip_nul(json_str: str) -> str:
+        """Drop U+0000 (raw or as a `\\u0000` escape) from serialized JSON text."""
+        if "\x00" in json_str:
+            json_str = json_str.replace("\x00", "")
+        if "\\u0000" in json_str:
+            json_str = _NUL_ESCAPE.sub(r"\1", json_str)
+        return json_str
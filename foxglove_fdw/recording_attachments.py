@@ -21,20 +21,29 @@ Filter push-down (equality): recording_id, site_id, device_id, device_name,
                               project_id
 Order by push-down: log_time (maps to logTime)
 
-LIMIT and OFFSET are partially supported: LIMIT is forwarded; OFFSET is ignored
-because the endpoint supports `offset` but Multicorn does not expose it in a
-portable way. (Could be added later if needed.)
+Results are fetched in pages of 2000 using the endpoint's `limit`/`offset`
+parameters until a short page comes back, so scans are no longer silently
+truncated at the API's default page size. A pushed `limit` pseudo-qual caps the
+total number of records fetched. From the second page on, the next page is
+prefetched in the background while the current one is consumed. SQL OFFSET
+is not pushed down (Multicorn does not expose it in a portable way).
 """
 
 from __future__ import annotations
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, Any, List
-import requests
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import requests, datetime as dt
+from .cache import cached_get, cached_iter
+from .http import get_session
+from .utils import parse_dt
 
 
 class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
     SUPPORTED_SORT_FIELDS = {"log_time", "logTime"}  # we expose log_time
+    PAGE_SIZE = 2000  # the endpoint's default (and practical max) page size
+    TIME_FIELDS = {"log_time", "create_time"}
 
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
@@ -46,6 +55,8 @@ class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url)
 
     # ---------- planner --------------------------------------------------
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -67,6 +78,8 @@ class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
     ):
         params: Dict[str, Any] = {}
         limit_ = None
+        # ids of quals the API request fully enforces; the rest are post-filtered
+        pushed: set[int] = set()
 
         # filter push‑down
         for q in quals:
@@ -85,9 +98,9 @@ class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
                 params["projectId"] = q.value
             elif fn == "limit":
                 limit_ = int(q.value)
-
-        if limit_:
-            params["limit"] = limit_
+            else:
+                continue
+            pushed.add(id(q))
 
         # ORDER BY push‑down (only first key, log_time)
         if sortkeys:
@@ -98,33 +111,23 @@ class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
                 params["sortBy"] = api_field
                 params["sortOrder"] = "desc" if sk.is_reversed else "asc"
 
-        # HTTP request
-        try:
-            r = requests.get(
-                f"{self.base_url}/recording-attachments",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
-                timeout=60,
-            )
-            r.raise_for_status()
-        except requests.HTTPError as e:
-            body = None
-            try:
-                body = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
-            raise RuntimeError(
-                f"foxglove_recording_attachments FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={params})"
-            )
-        attachments: list[dict] = r.json()
+        # HTTP requests: offset-paginated, each page parsed as it streams in
+        attachments: Iterable[dict] = self._iter_pages(params, limit_ if limit_ and limit_ > 0 else None)
 
         # local sort fallback if not pushed
         if sortkeys and "sortBy" not in params:
             sk = sortkeys[0]
             key = "logTime" if sk.attname in ("log_time", "logTime") else sk.attname
             # Use empty string fallback to satisfy ordering even if value missing
-            attachments.sort(key=lambda d, k=key: str(d.get(k) or ""), reverse=sk.is_reversed)  # type: ignore
-
+            attachments = sorted(attachments, key=lambda d, k=key: str(d.get(k) or ""), reverse=sk.is_reversed)  # type: ignore
+
+        # Residual equality quals as (field, value) pairs, built once per scan;
+        # timestamp values are parsed here so rows compare as datetimes
+        typed_quals = [
+            (q.field_name, parse_dt(q.value) if q.field_name in self.TIME_FIELDS else q.value)
+            for q in quals
+            if q.operator == "=" and id(q) not in pushed
+        ]
         for a in attachments:
             row = {
                 "id": a.get("id"),
@@ -139,15 +142,77 @@ class FoxgloveRecordingAttachmentsFDW(ForeignDataWrapper):
                 "fingerprint": a.get("fingerprint"),
                 "lake_path": a.get("lakePath"),
             }
-            if not self._row_matches_quals(row, quals):
+            if typed_quals and not self._row_matches_quals(row, typed_quals):
                 continue
             yield {c: row.get(c) for c in columns}
 
     # ---------- helpers --------------------------------------------------
+    def _iter_pages(self, params: Dict[str, Any], limit_: Optional[int]) -> Iterator[dict]:
+        """Yield attachments page by page via limit/offset, stopping at `limit_` records.
+
+        Pages are parsed incrementally, so the first rows are available before a
+        page has finished downloading and memory stays bounded by one record.
+        Once a scan reaches its second page it is likely to need more, so from
+        then on the next page is fetched on a background thread while the
+        current one is being consumed, hiding the per-page round trip.
+        """
+        url = f"{self.base_url}/recording-attachments"
+        offset = 0
+        pool: Optional[ThreadPoolExecutor] = None
+        prefetch: Optional[Future] = None
+        try:
+            while True:
+                page_params = self._page_params(params, offset, limit_)
+                page_size = page_params["limit"]
+                try:
+                    if prefetch is not None:
+                        page: Iterable[dict] = prefetch.result()
+                    else:
+                        page = cached_iter(self._session, url, page_params, 0, timeout=60)
+                except requests.HTTPError as e:
+                    body = e.response.text if e.response is not None else None
+                    raise RuntimeError(
+                        f"foxglove_recording_attachments FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={page_params})"
+                    )
+                # assume this page is full; if it is not, the scan ends and the
+                # prefetched page is simply dropped
+                prefetch = None
+                next_offset = offset + page_size
+                if offset > 0 and (limit_ is None or next_offset < limit_):
+                    pool = pool or ThreadPoolExecutor(max_workers=1)
+                    prefetch = pool.submit(
+                        cached_get, self._session, url, self._page_params(params, next_offset, limit_), 0, 60
+                    )
+                got = 0
+                for a in page:
+                    got += 1
+                    yield a
+                offset += got
+                if got < page_size or (limit_ is not None and offset >= limit_):
+                    return
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _page_params(self, params: Dict[str, Any], offset: int, limit_: Optional[int]) -> Dict[str, Any]:
+        page_size = self.PAGE_SIZE if limit_ is None else min(self.PAGE_SIZE, limit_ - offset)
+        return {**params, "limit": page_size, "offset": offset}
+
     @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
-        for q in quals:
-            if q.operator == "=" and q.field_name in row:
-                if str(row[q.field_name]) != str(q.value):
+    def _row_matches_quals(row: Dict[str, Any], typed_quals: List[Tuple[str, Any]]) -> bool:
+        """Prefilter on residual `field = value` pairs; Postgres re-checks every qual."""
+        for fn, v in typed_quals:
+            if fn not in row:
+                continue
+            cur = row[fn]
+            if isinstance(v, dt.datetime):
+                # API ISO `...Z` string vs. parsed timestamptz qual
+                if parse_dt(cur) != v:
+                    return False
+            elif type(cur) is type(v):
+                if cur != v:
                     return False
+            # differing types (e.g. API string vs. SQL value): compare textually
+            elif str(cur) != str(v):
+                return False
         return True
@@ -6,9 +6,10 @@ Exposes GET /v1/recordings with columns start_time / end_time instead of start
 from __future__ import annotations
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, List, Any, Optional
-import requests, json, datetime as dt
-from .utils import to_iso8601, parse_dt
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import requests, datetime as dt
+from .http import JSON_HEADERS, get_session
+from .utils import TimeQualHandler, TimeWindow, json_dumps, json_loads, to_iso8601, parse_dt
 
 
 class FoxgloveRecordingsFDW(ForeignDataWrapper):
@@ -24,6 +25,60 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
         "importedAt",
     }
 
+    # direct equality quals passed through as query params: SQL column -> API param
+    EQ_PUSHDOWN = {
+        "deviceId": "deviceId",
+        "device_id": "deviceId",
+        "deviceName": "deviceName",
+        "device_name": "deviceName",
+        "path": "path",
+        "projectId": "projectId",
+        "project_id": "projectId",
+        "importStatus": "importStatus",
+        "import_status": "importStatus",
+        # pseudo filter column – filter recordings containing a topic
+        "topic": "topic",
+    }
+
+    # (field, op) -> how the qual narrows the API's start/end window. The API
+    # takes start as a lower bound on start time and end as an upper bound on
+    # end time, so start_time upper bounds and end_time lower bounds are mapped
+    # onto the opposite edge of the window (a superset; Postgres re-checks).
+    TIME_QUAL_HANDLERS: Dict[Tuple[str, str], TimeQualHandler] = {
+        ("start_time", ">"): TimeWindow.raise_lower,
+        ("start_time", ">="): TimeWindow.raise_lower,
+        ("start_time", "="): TimeWindow.pin,
+        ("start_time", "<"): TimeWindow.lower_upper,
+        ("start_time", "<="): TimeWindow.lower_upper,
+        ("end_time", "<"): TimeWindow.lower_upper,
+        ("end_time", "<="): TimeWindow.lower_upper,
+        ("end_time", "="): TimeWindow.lower_upper,
+        ("end_time", ">"): TimeWindow.raise_lower,
+        ("end_time", ">="): TimeWindow.raise_lower,
+    }
+
+    # SQL column -> value from one API recording record
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        "id": lambda r: r.get("id"),
+        "project_id": lambda r: r.get("projectId"),
+        "path": lambda r: r.get("path"),
+        "size_bytes": lambda r: r.get("size"),
+        "created_at": lambda r: r.get("createdAt"),
+        "imported_at": lambda r: r.get("importedAt"),
+        "start_time": lambda r: r.get("start"),
+        "end_time": lambda r: r.get("end"),
+        "import_status": lambda r: r.get("importStatus"),
+        "site_id": lambda r: (r.get("site") or {}).get("id"),
+        "site_name": lambda r: (r.get("site") or {}).get("name"),
+        "edge_site_id": lambda r: (r.get("edgeSite") or {}).get("id"),
+        "edge_site_name": lambda r: (r.get("edgeSite") or {}).get("name"),
+        "device_id": lambda r: (r.get("device") or {}).get("id"),
+        "device_name": lambda r: (r.get("device") or {}).get("name"),
+        "key": lambda r: r.get("key"),
+        # serialized only when the column is projected or filtered on
+        "metadata": lambda r: json_dumps(r.get("metadata", [])),
+    }
+
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
         self.columns = columns
@@ -34,6 +89,8 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url)
 
     # ---------- planner ------------------------------------------------------
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -62,72 +119,36 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
         # Track time bounds we can push to the API. The Foxglove API accepts
         #   start: lower bound on start time (>=)
         #   end:   upper bound on end time (<=)
-        start_lower: Optional[str] = None
-        end_upper: Optional[str] = None
+        window = TimeWindow()
+        # ids of quals translated into request params; only the rest are post-filtered
+        pushed: set[int] = set()
 
         for q in quals:
             fn = q.field_name
             op = getattr(q, "operator", "=")
 
             # direct string/enum equalities we can pass through
-            eq_map = {
-                "deviceId": "deviceId",
-                "device_id": "deviceId",
-                "deviceName": "deviceName",
-                "device_name": "deviceName",
-                "path": "path",
-                "projectId": "projectId",
-                "project_id": "projectId",
-                "importStatus": "importStatus",
-                "import_status": "importStatus",
-                # pseudo filter column – filter recordings containing a topic
-                "topic": "topic",
-            }
-            if op == "=" and fn in eq_map:
-                params[eq_map[fn]] = q.value
-                continue
-
-            # Push start_time lower bounds and tighten equality with an upper bound
-            if fn == "start_time" and op in (">", ">=", "="):
-                iso = to_iso8601(q.value)
-                # keep the most restrictive (max) lower bound if multiple quals
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
-                # If it's equality, also tighten the upper bound to the same instant
-                if op == "=":
-                    if end_upper is None or iso < end_upper:
-                        end_upper = iso
+            api_field = self.EQ_PUSHDOWN.get(fn)
+            if api_field is not None and op == "=":
+                params[api_field] = q.value
+                pushed.add(id(q))
                 continue
 
-            # Push start_time upper bounds (<, <=) by mapping to API 'end'
-            if fn == "start_time" and op in ("<", "<="):
-                iso = to_iso8601(q.value)
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                continue
-
-            # Push end_time upper bounds
-            if fn == "end_time" and op in ("<", "<=", "="):
-                iso = to_iso8601(q.value)
-                # keep the most restrictive (min) upper bound if multiple quals
-                if end_upper is None or iso < end_upper:
-                    end_upper = iso
-                continue
-
-            # Push end_time lower bounds (end_time > X) by using start of the window
-            if fn == "end_time" and op in (">", ">="):
-                iso = to_iso8601(q.value)
-                if start_lower is None or iso > start_lower:
-                    start_lower = iso
+            handler = self.TIME_QUAL_HANDLERS.get((fn, op))
+            if handler is not None:
+                handler(window, to_iso8601(q.value))
+                pushed.add(id(q))
                 continue
 
             # capture a LIMIT if a pseudo column was used (rare)
             if op == "=" and fn == "limit":
                 try:
                     limit_ = int(q.value)
+                    pushed.add(id(q))
                 except Exception:
                     limit_ = None
 
+        start_lower, end_upper = window.lower, window.upper
         # If either bound is present, supply both to satisfy API requirements
         if start_lower and not end_upper:
             end_upper = to_iso8601(dt.datetime.now(dt.timezone.utc))
@@ -159,11 +180,8 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
 
         # ---- HTTP call ------------------------------------------------------
         try:
-            r = requests.get(
-                f"{self.base_url}/recordings",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
-                timeout=60,
+            r = self._session.get(
+                f"{self.base_url}/recordings", params=params, headers=JSON_HEADERS, timeout=60
             )
             r.raise_for_status()
         except requests.HTTPError as e:
@@ -175,7 +193,8 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
             raise RuntimeError(
                 f"foxglove_recordings FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={params})"
             )
-        recs: list[dict] = r.json()
+        # orjson on the raw bytes: faster than r.json() and skips charset sniffing
+        recs: list[dict] = json_loads(r.content)
         topic_filter = params.get("topic")
 
         # ---- local sort fallback -------------------------------------------
@@ -185,50 +204,54 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
             recs.sort(key=lambda d: d.get(api_key), reverse=sk.is_reversed)  # type: ignore
 
         # ---- yield rows -----------------------------------------------------
+        # Postgres re-applies every qual to the rows we return, so the local
+        # filter is only a prefilter: skip it when every qual went to the API.
+        residual = [q for q in quals if id(q) not in pushed]
+        # Build only the projected columns (plus any the residual filter reads);
+        # duration and the topic pseudo column are filled in per row below
+        extractors = self.FIELD_EXTRACTORS
+        want_duration = "duration" in columns
+        want_topic = "topic" in columns or any(q.field_name == "topic" for q in residual)
+        cols = [c for c in columns if c in extractors]
+        extra = [f for f in {q.field_name for q in residual} if f in extractors and f not in cols]
+        needed = cols + extra
+        # rows carry filter-only keys that must be dropped before yielding
+        project = bool(extra) or (want_topic and "topic" not in columns)
+        need_dts = want_duration or bool(residual)
         for r_ in recs:
-            duration_s = None
-            if "duration" in columns:
-                try:
-                    duration_s = (
-                        dt.datetime.fromisoformat(r_["end"])
-                        - dt.datetime.fromisoformat(r_["start"])
-                    ).total_seconds()
-                except Exception:
-                    duration_s = None
-
-            row = {
-                "id": r_.get("id"),
-                "project_id": r_.get("projectId"),
-                "path": r_.get("path"),
-                "size_bytes": r_.get("size"),
-                "created_at": r_.get("createdAt"),
-                "imported_at": r_.get("importedAt"),
-                "start_time": r_.get("start"),
-                "end_time": r_.get("end"),
-                "duration": duration_s,
-                "import_status": r_.get("importStatus"),
-                "site_id": (r_.get("site") or {}).get("id"),
-                "site_name": (r_.get("site") or {}).get("name"),
-                "edge_site_id": (r_.get("edgeSite") or {}).get("id"),
-                "edge_site_name": (r_.get("edgeSite") or {}).get("name"),
-                "device_id": (r_.get("device") or {}).get("id"),
-                "device_name": (r_.get("device") or {}).get("name"),
-                "key": r_.get("key"),
-                "metadata": json.dumps(r_.get("metadata", [])),
+            # parse each API timestamp once; shared by duration and the prefilter
+            start_dt = end_dt = None
+            if need_dts:
+                start_dt = parse_dt(r_.get("start"))
+                end_dt = parse_dt(r_.get("end"))
+            row = {c: extractors[c](r_) for c in needed}
+            if want_duration:
+                row["duration"] = (
+                    (end_dt - start_dt).total_seconds()
+                    if start_dt is not None and end_dt is not None
+                    else None
+                )
+            if want_topic:
                 # pseudo filter column (not returned by API payload)
-                "topic": topic_filter,
-            }
-            if not self._row_matches_quals(row, quals):
+                row["topic"] = topic_filter
+            if residual and not self._row_matches_quals(row, residual, start_dt, end_dt):
                 continue
-            yield {c: row.get(c) for c in columns}
+            yield {c: row.get(c) for c in columns} if project else row
 
     # ---------- helpers ------------------------------------------------------
     @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
+    def _row_matches_quals(
+        row: Dict[str, Any],
+        quals: List,
+        start_dt: Optional[dt.datetime] = None,
+        end_dt: Optional[dt.datetime] = None,
+    ) -> bool:
         """Lightweight local filter to reduce rows before handing back to Postgres.
         Supports = on all fields and range ops on start_time/end_time.
         Postgres will still enforce quals, this is just a best-effort prefilter.
+        `start_dt` / `end_dt` are the row's already-parsed start_time / end_time.
         """
+        parsed = {"start_time": start_dt, "end_time": end_dt}
 
         for q in quals:
             fn = q.field_name
@@ -244,7 +267,7 @@ class FoxgloveRecordingsFDW(ForeignDataWrapper):
 
             # Range ops on timestamptz fields
             if fn in ("start_time", "end_time") and op in (">", ">=", "<", "<="):
-                lhs = parse_dt(row[fn])
+                lhs = parsed[fn] or parse_dt(row[fn])
                 rhs = parse_dt(q.value)
                 if lhs is None or rhs is None:
                     # If we can't parse, don't prefilter; let Postgres handle it
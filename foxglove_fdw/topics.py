@@ -11,6 +11,11 @@ Returned fields (we intentionally exclude the large `schema` field for performan
   schema_name      text    (API: schemaName)
   schema_encoding  text    (API: schemaEncoding)
 
+Projection: the endpoint has no field selector, so `includeSchemas=false` is
+the only server-side trimming (it drops the schema blobs, by far the bulk of
+the response). The remaining fields are small; only the selected columns are
+read from each record when building rows.
+
 Push-down filters supported as query params:
     device_id      (=)         -> deviceId
     device_name    (=)         -> deviceName
@@ -29,18 +34,66 @@ Other quals (e.g. topic='foo') are post-filtered locally since API does not
 expose direct filtering by topic/version besides time/device/recording constraints.
 
 ORDER BY push-down: topic, version.
+
+Server options:
+  - base_url        defaults to https://api.foxglove.dev/v1
+  - cache_ttl       seconds to reuse an identical API response (default 30;
+                    0 disables). Topic listings for a recording rarely change.
+  - stale_if_error  seconds past cache_ttl an expired response may still be
+                    served, with a WARNING, if the API is unreachable or
+                    returns 429/5xx (default 300; 0 disables)
 """
 
 from __future__ import annotations
 from multicorn import ForeignDataWrapper, SortKey
 from multicorn.utils import log_to_postgres, WARNING
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 import requests
-from .utils import to_iso8601
+from .cache import cached_get, cached_iter
+from .http import get_session
+from .utils import TimeQualHandler, TimeWindow, to_iso8601, parse_option
 
 
 class FoxgloveTopicsFDW(ForeignDataWrapper):
     SUPPORTED_SORT_FIELDS = {"topic", "version"}
+    # equality quals passed through as query params: SQL column -> API param
+    EQ_PUSHDOWN = {
+        "device_id": "deviceId",
+        "device_name": "deviceName",
+        "recording_id": "recordingId",
+        "recording_key": "recordingKey",
+        "project_id": "projectId",
+    }
+    # (field, op) -> how the qual narrows the start/end window
+    # (we take the max of the lower bounds and the min of the upper bounds)
+    TIME_QUAL_HANDLERS: Dict[Tuple[str, str], TimeQualHandler] = {
+        ("start_time", "="): TimeWindow.raise_lower,
+        ("start_time", ">="): TimeWindow.raise_lower,
+        ("start_time", ">"): TimeWindow.raise_lower,
+        ("end_time", "="): TimeWindow.lower_upper,
+        ("end_time", "<="): TimeWindow.lower_upper,
+        ("end_time", "<"): TimeWindow.lower_upper,
+    }
+    # SQL column -> value from one API topic record
+    FIELD_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        "topic": lambda t: t.get("topic"),
+        "version": lambda t: t.get("version"),
+        "encoding": lambda t: t.get("encoding"),
+        "schema_name": lambda t: t.get("schemaName"),
+        "schema_encoding": lambda t: t.get("schemaEncoding"),
+    }
+    # pseudo columns populated with the request filter value (if present)
+    PSEUDO_COLUMN_PARAMS = {
+        "device_id": "deviceId",
+        "device_name": "deviceName",
+        "recording_id": "recordingId",
+        "recording_key": "recordingKey",
+        "start_time": "start",
+        "end_time": "end",
+        "project_id": "projectId",
+    }
+    DEFAULT_CACHE_TTL = 30.0  # seconds
+    DEFAULT_STALE_IF_ERROR = 300.0  # seconds
 
     def __init__(self, options: Dict[str, str], columns: Dict[str, Any]) -> None:
         super().__init__(options, columns)
@@ -52,6 +105,12 @@ class FoxgloveTopicsFDW(ForeignDataWrapper):
                 "foxglove_fdw: `api_key` option (or USER MAPPING) is required",
                 level=WARNING,
             )
+        self.cache_ttl = parse_option(options, "cache_ttl", self.DEFAULT_CACHE_TTL, float)
+        self.stale_if_error = parse_option(
+            options, "stale_if_error", self.DEFAULT_STALE_IF_ERROR, float
+        )
+        # pooled session with the Authorization header bound once, not per scan
+        self._session = get_session(self.api_key, self.base_url)
 
     # ---------- planner --------------------------------------------------
     def get_rel_size(self, quals, columns):  # type: ignore[override]
@@ -71,69 +130,47 @@ class FoxgloveTopicsFDW(ForeignDataWrapper):
     def execute(  # type: ignore[override]
         self, quals: List, columns: List, sortkeys: List[SortKey] | None = None
     ):
-        params: Dict[str, Any] = {"includeSchemas": "false"}  # never fetch schemas
+        # Preflight validation to avoid opaque API 400s; it only needs the qual
+        # names, so a rejected query never reaches timestamp conversion
+        self._preflight(
+            {
+                q.field_name
+                for q in quals
+                if (q.field_name, q.operator) in self.TIME_QUAL_HANDLERS
+                or (q.operator == "=" and q.field_name in self.EQ_PUSHDOWN and q.value)
+            }
+        )
+
+        # never fetch schemas; there is no `fields`-style selector to trim further,
+        # and unknown params risk a 400, so nothing else is sent for projection
+        params: Dict[str, Any] = {"includeSchemas": "false"}
         limit_: Optional[int] = None
-        recording_id = None
-        recording_key = None
-        device_id = None
-        device_name = None
-        start_candidates: List[str] = []
-        end_candidates: List[str] = []
+        source: Dict[str, Any] = {}  # API source-selection params (deviceId, recordingId, ...)
+        window = TimeWindow()
 
         for q in quals:
             fn, op = q.field_name, q.operator
             # Handle supported operators for temporal push-down
-            if fn == "start_time" and op in ("=", ">=", ">"):
-                start_candidates.append(to_iso8601(q.value))
-                continue
-            if fn == "end_time" and op in ("=", "<=", "<"):
-                end_candidates.append(to_iso8601(q.value))
+            handler = self.TIME_QUAL_HANDLERS.get((fn, op))
+            if handler is not None:
+                handler(window, to_iso8601(q.value))
                 continue
             if op != "=":  # other operators not push-down (except temporal handled above)
                 continue
-            if fn == "device_id":
-                device_id = q.value
-            elif fn == "device_name":
-                device_name = q.value
-            elif fn == "recording_id":
-                recording_id = q.value
-            elif fn == "recording_key":
-                recording_key = q.value
-            elif fn == "project_id":
-                params["projectId"] = q.value
+            api_param = self.EQ_PUSHDOWN.get(fn)
+            if api_param is not None:
+                source[api_param] = q.value
             elif fn == "limit":
-                try:
-                    limit_ = int(q.value)
-                except Exception:
-                    pass
+                limit_ = self._parse_limit(q.value)
             # topic/version equality not push‑down; post‑filter
 
-        # Apply start/end selection logic (choose max for start, min for end)
-        if start_candidates:
-            params["start"] = max(start_candidates)
-        if end_candidates:
-            params["end"] = min(end_candidates)
-
-        # Preflight validation to avoid opaque API 400s
-        if not recording_id and not recording_key:
-            # Need device + start + end combination
-            if not (device_id or device_name):
-                raise RuntimeError(
-                    "foxglove_topics FDW: provide either recording_id/recording_key OR (device_id/device_name plus start_time and end_time) for topics query"
-                )
-            if "start" not in params or "end" not in params:
-                raise RuntimeError(
-                    "foxglove_topics FDW: when querying by device you must also supply both start_time and end_time"
-                )
+        if window.lower:
+            params["start"] = window.lower
+        if window.upper:
+            params["end"] = window.upper
+
         # Assign device/recording params after validation
-        if device_id:
-            params["deviceId"] = device_id
-        if device_name:
-            params["deviceName"] = device_name
-        if recording_id:
-            params["recordingId"] = recording_id
-        if recording_key:
-            params["recordingKey"] = recording_key
+        params.update((k, v) for k, v in source.items() if v)
 
         if limit_:
             params["limit"] = limit_
@@ -146,62 +183,97 @@ class FoxgloveTopicsFDW(ForeignDataWrapper):
                 params["sortOrder"] = "desc" if sk.is_reversed else "asc"
 
         debug = False  # set True via manual edit if needed; could be optionized later
+        if debug:
+            log_to_postgres(f"foxglove_topics request params: {params}")
         try:
-            r = requests.get(
+            # stream the response array unless it has to be sorted locally
+            # first; either way the records are shared, read-only cache entries
+            fetch = cached_get if sortkeys and "sortBy" not in params else cached_iter
+            topics: Iterable[dict] = fetch(
+                self._session,
                 f"{self.base_url}/data/topics",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                params=params,
+                params,
+                self.cache_ttl,
                 timeout=60,
+                stale_if_error=self.stale_if_error,
             )
-            if debug:
-                log_to_postgres(f"foxglove_topics request params: {params}")
-            r.raise_for_status()
         except requests.HTTPError as e:
             # Surface clearer diagnostics including body
-            body = None
-            try:
-                body = r.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+            body = e.response.text if e.response is not None else None
             raise RuntimeError(
                 f"foxglove_topics FDW upstream error {e.response.status_code if e.response else ''}: {body} (params={params})"
             )
-        topics: list[dict] = r.json()
 
         if sortkeys and "sortBy" not in params:
             sk = sortkeys[0]
+            # cached_get returned a list here; nothing to order below two rows
+            if len(topics) > 1:  # type: ignore[arg-type]
+                # go through the column getter so e.g. schema_name reads schemaName
+                attname = sk.attname
+                get: Callable[[Dict[str, Any]], Any] = self.FIELD_EXTRACTORS.get(attname) or (
+                    lambda rec: rec.get(attname)
+                )
+                topics = sorted(
+                    topics,
+                    key=lambda rec: "" if (v := get(rec)) is None else str(v),
+                    reverse=sk.is_reversed,
+                )
 
-            def _sort_key(rec: Dict[str, Any], field: str = sk.attname) -> str:
-                val = rec.get(field)
-                return "" if val is None else str(val)
-
-            topics.sort(key=_sort_key, reverse=sk.is_reversed)
-
+        # Only equality on the topic record's own fields needs checking here;
+        # the pseudo columns echo request params the API already applied.
+        extractors = self.FIELD_EXTRACTORS
+        eq_filters: List[Tuple[Callable[[Dict[str, Any]], Any], str]] = [
+            (extractors[q.field_name], str(q.value))
+            for q in quals
+            if q.operator == "=" and q.field_name in extractors
+        ]
+        # Build only the projected columns, straight from each API record;
+        # pseudo columns are the same for every row, so resolve them once.
+        builders = [(c, extractors[c]) for c in columns if c in extractors]
+        constants = {c: params.get(self.PSEUDO_COLUMN_PARAMS[c]) for c in columns if c in self.PSEUDO_COLUMN_PARAMS}
+        emitted = 0
         for t in topics:
-            row = {
-                "topic": t.get("topic"),
-                "version": t.get("version"),
-                "encoding": t.get("encoding"),
-                "schema_name": t.get("schemaName"),
-                "schema_encoding": t.get("schemaEncoding"),
-                # populate pseudo columns with the request filter values (if present)
-                "device_id": params.get("deviceId"),
-                "device_name": params.get("deviceName"),
-                "recording_id": params.get("recordingId"),
-                "recording_key": params.get("recordingKey"),
-                "start_time": params.get("start"),
-                "end_time": params.get("end"),
-                "project_id": params.get("projectId"),
-            }
-            if not self._row_matches_quals(row, quals):
+            if eq_filters and not self._record_matches(t, eq_filters):
                 continue
-            yield {c: row.get(c) for c in columns}
+            row = {c: fn(t) for c, fn in builders}
+            if constants:
+                row.update(constants)
+            yield row
+            emitted += 1
+            if limit_ and emitted >= limit_:
+                return
 
     # ---------- helpers --------------------------------------------------
     @staticmethod
-    def _row_matches_quals(row: Dict[str, Any], quals: List) -> bool:
-        for q in quals:
-            if q.operator == "=" and q.field_name in row:
-                if str(row[q.field_name]) != str(q.value):
-                    return False
+    def _preflight(present: set) -> None:
+        """Reject quals the API cannot serve: it needs recording_id/recording_key,
+        or device_id/device_name plus both start_time and end_time."""
+        if present & {"recording_id", "recording_key"}:
+            return
+        if not present & {"device_id", "device_name"}:
+            raise RuntimeError(
+                "foxglove_topics FDW: provide either recording_id/recording_key OR (device_id/device_name plus start_time and end_time) for topics query"
+            )
+        if not {"start_time", "end_time"} <= present:
+            raise RuntimeError(
+                "foxglove_topics FDW: when querying by device you must also supply both start_time and end_time"
+            )
+
+    @staticmethod
+    def _parse_limit(value: Any) -> Optional[int]:
+        """Value of a pushed `limit = N` pseudo-qual, or None when it is not an integer."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _record_matches(t: Dict[str, Any], eq_filters: List[Tuple[Callable[[Dict[str, Any]], Any], str]]) -> bool:
+        """Prefilter on hoisted `field = str(value)` pairs; Postgres re-checks every qual."""
+        for get, v in eq_filters:
+            cur = get(t)
+            # API fields are strings, so this is almost always a plain compare;
+            # only other types pay for str()
+            if cur != v and (cur is None or type(cur) is str or str(cur) != v):
+                return False
         return True
@@ -3,11 +3,108 @@ Shared utilities for foxglove_fdw.
 
 Currently exposes:
   - to_iso8601(val): normalize various datetime inputs to RFC3339 UTC (no micros), e.g. 2025-08-09T20:20:12Z
+  - parse_dt(val): parse datetime-ish inputs into an aware datetime (or None)
+  Both are memoized, since the same qual values (and API timestamps) are
+  converted over and over across planner calls and post-filter rows.
+  - ns_to_iso8601(ns): format integer epoch nanoseconds as RFC3339 UTC with
+    microseconds when non-zero, e.g. 2025-08-09T20:20:12.123456Z; only the
+    whole-second prefix is memoized, since nanosecond values rarely repeat
+  - parse_option(options, name, default, cast): read a typed server/table option
+  - as_bool(s): strict boolean cast for parse_option ("true"/"on"/"1", ...)
+  - RANGE_OPS: comparison functions for the range operators found on quals
+  - json_dumps(obj) / json_loads(s): orjson-backed JSON helpers (stdlib fallback)
+  - TimeWindow: accumulates the narrowest start/end window implied by time quals;
+    its methods double as handlers in per-FDW `(field, op) -> handler` tables
 """
 
 from __future__ import annotations
-from typing import Any, Optional
+from multicorn.utils import log_to_postgres, WARNING
+from typing import Any, Callable, Dict, Optional, TypeVar
 import datetime as dt
+import functools
+import json
+import operator
+import re
+import time
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is a declared dependency
+    orjson = None  # type: ignore[assignment]
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RANGE_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+class TimeWindow:
+    """Narrowest [lower, upper] pair of RFC3339 strings seen so far (None = unbounded)."""
+
+    __slots__ = ("lower", "upper")
+
+    def __init__(self) -> None:
+        self.lower: Optional[str] = None
+        self.upper: Optional[str] = None
+
+    def raise_lower(self, iso: str) -> None:
+        if self.lower is None or iso > self.lower:
+            self.lower = iso
+
+    def lower_upper(self, iso: str) -> None:
+        if self.upper is None or iso < self.upper:
+            self.upper = iso
+
+    def pin(self, iso: str) -> None:
+        self.raise_lower(iso)
+        self.lower_upper(iso)
+
+
+TimeQualHandler = Callable[[TimeWindow, str], None]
+
+
+def json_dumps(obj: Any) -> str:
+    """Serialize `obj` to a compact JSON string, using orjson when available.
+
+    Falls back to the stdlib for values orjson refuses (e.g. integers wider
+    than 64 bits).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+
+def json_loads(s: str | bytes) -> Any:
+    """Parse a JSON document from str or bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def _memoize(fn: Callable[[Any], R]) -> Callable[[Any], R]:
+    """lru_cache `fn`, falling back to the uncached call for unhashable inputs."""
+    cached = functools.lru_cache(maxsize=1024)(fn)
+
+    @functools.wraps(fn)
+    def wrapper(val: Any) -> R:
+        try:
+            return cached(val)
+        except TypeError:
+            return fn(val)
+
+    return wrapper
+
+
+# already in to_iso8601's output form (shape only; field ranges are not checked)
+_RFC3339_UTC_SECONDS = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z")
 
 
 def to_iso8601(val: Any) -> str:
@@ -18,33 +115,54 @@ def to_iso8601(val: Any) -> str:
       - typical timestamptz strings like 'YYYY-MM-DD HH:MM:SS.mmmmmm-07'
       - ISO 8601 strings with 'T' and 'Z'
 
+    Strings already in the output form are returned as-is, without parsing;
+    everything else goes through a memoized parse.
     Raises ValueError if the value cannot be parsed into a datetime.
     """
+    if isinstance(val, str) and len(val) == 20 and _RFC3339_UTC_SECONDS.fullmatch(val):
+        return val
+    return _to_iso8601(val)
+
+
+@_memoize
+def _to_iso8601(val: Any) -> str:
     if isinstance(val, dt.datetime):
-        d = val if val.tzinfo else val.replace(tzinfo=dt.timezone.utc)
+        d = val
     else:
-        s = str(val).strip()
-        # Replace space with 'T'
-        if "T" not in s and " " in s:
-            s = s.replace(" ", "T", 1)
-        # If no TZ specified, assume UTC
-        if not any(z in s for z in ("Z", "+", "-")):
-            s += "Z"
-        # Normalize trailing Z
-        if s.endswith("Z"):
-            try:
-                d = dt.datetime.fromisoformat(s.replace("Z", "+00:00"))
-            except Exception as e:
-                raise ValueError(f"to_iso8601: could not parse timestamp {val!r}") from e
-        else:
-            try:
-                d = dt.datetime.fromisoformat(s)
-            except Exception as e:
-                raise ValueError(f"to_iso8601: could not parse timestamp {val!r}") from e
-    d = d.astimezone(dt.timezone.utc)
-    return d.strftime("%Y-%m-%dT%H:%M:%SZ")
+        # Python 3.11's fromisoformat takes a space separator, a trailing 'Z'
+        # and short offsets like '-07' itself, so the string needs no
+        # pre-scanning for a timezone marker.
+        try:
+            d = dt.datetime.fromisoformat(str(val).strip())
+        except ValueError as e:
+            raise ValueError(f"to_iso8601: could not parse timestamp {val!r}") from e
+    # If no TZ specified, assume UTC
+    d = d.astimezone(dt.timezone.utc) if d.tzinfo else d.replace(tzinfo=dt.timezone.utc)
+    # fixed-width fields instead of strftime's format-string interpretation
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}T{d.hour:02d}:{d.minute:02d}:{d.second:02d}Z"
+
+
+@functools.lru_cache(maxsize=1024)
+def _utc_second(sec: int) -> str:
+    t = time.gmtime(sec)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 
+def ns_to_iso8601(ns: int) -> str:
+    """Format epoch nanoseconds (e.g. an MCAP log_time) as an RFC3339 UTC string.
+
+    Sub-microsecond digits are truncated, matching timestamptz precision. The
+    whole-second prefix is memoized: high-rate sources emit many values per
+    second, so building the string is mostly a cache hit plus an f-string.
+    """
+    sec, rem = divmod(ns, 1_000_000_000)
+    us = rem // 1000
+    if us:
+        return f"{_utc_second(sec)}.{us:06d}Z"
+    return f"{_utc_second(sec)}Z"
+
+
+@_memoize
 def parse_dt(val: Any) -> Optional[dt.datetime]:
     """Parse various datetime inputs into a timezone-aware datetime.
 
@@ -64,3 +182,31 @@ def parse_dt(val: Any) -> Optional[dt.datetime]:
     except Exception:
         return None
     return d if d.tzinfo else d.replace(tzinfo=dt.timezone.utc)
+
+
+def as_bool(s: str) -> bool:
+    """Parse a boolean option value; raises ValueError for anything unrecognized."""
+    v = str(s).strip().lower()
+    if v in ("true", "t", "yes", "on", "1"):
+        return True
+    if v in ("false", "f", "no", "off", "0"):
+        return False
+    raise ValueError(f"not a boolean: {s!r}")
+
+
+def parse_option(options: Dict[str, str], name: str, default: T, cast: Callable[[str], T]) -> T:
+    """Return `cast(options[name])`, or `default` when the option is absent or invalid.
+
+    Invalid values are reported with a WARNING rather than failing the scan.
+    """
+    raw = options.get(name)
+    if raw is None:
+        return default
+    try:
+        return cast(raw)
+    except (TypeError, ValueError):
+        log_to_postgres(
+            f"foxglove_fdw: ignoring invalid `{name}` option {raw!r}; using {default!r}",
+            level=WARNING,
+        )
+        return default
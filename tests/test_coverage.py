@@ -0,0 +1,26 @@
+import datetime as dt
+
+import pytest
+
+multicorn = pytest.importorskip("multicorn")
+
+import foxglove_fdw.coverage as coverage  # noqa: E402
+
+RANGES = [
+    # overlaps the requested window but starts before it
+    {"deviceId": "d0", "start": "2025-08-09T19:00:00Z", "end": "2025-08-09T20:30:00Z"},
+    {"deviceId": "d1", "start": "2025-08-09T20:10:00Z", "end": "2025-08-09T20:30:00Z"},
+    {"deviceId": "d2", "start": "2025-08-09T20:20:00Z", "end": "2025-08-09T20:40:00Z"},
+]
+
+
+def scan(monkeypatch, quals, columns):
+    monkeypatch.setattr(coverage, "cached_iter", lambda *args, **kwargs: iter(RANGES))
+    fdw = coverage.FoxgloveCoverageFDW({"api_key": "k"}, {})
+    return list(fdw.execute(quals, columns))
+
+
+def test_limit_counts_rows_passing_time_quals_and_is_echoed(monkeypatch):
+    since = dt.datetime(2025, 8, 9, 20, 0, tzinfo=dt.timezone.utc)
+    quals = [multicorn.Qual("start_time", ">=", since), multicorn.Qual("limit", "=", 1)]
+    assert scan(monkeypatch, quals, ["device_id", "limit"]) == [{"device_id": "d1", "limit": 1}]
@@ -0,0 +1,23 @@
+import datetime as dt
+
+import pytest
+
+multicorn = pytest.importorskip("multicorn")
+
+import foxglove_fdw.events as events  # noqa: E402
+
+EVENTS = [
+    {"id": "e1", "createdAt": "2025-08-09T20:20:12.123Z", "start": "2025-08-09T20:00:00Z"},
+    {"id": "e2", "createdAt": "2025-08-09T20:20:13Z", "start": "2025-08-09T20:00:01Z"},
+]
+
+
+def scan(monkeypatch, quals):
+    monkeypatch.setattr(events, "cached_iter", lambda *args, **kwargs: iter(EVENTS))
+    fdw = events.FoxgloveEventsFDW({"api_key": "k"}, {})
+    return [r["id"] for r in fdw.execute(quals, ["id"])]
+
+
+def test_timestamp_equality_matches_api_iso_string(monkeypatch):
+    ts = dt.datetime(2025, 8, 9, 20, 20, 12, 123000, tzinfo=dt.timezone.utc)
+    assert scan(monkeypatch, [multicorn.Qual("created_at", "=", ts)]) == ["e1"]
@@ -0,0 +1,30 @@
+import datetime as dt
+
+import pytest
+
+multicorn = pytest.importorskip("multicorn")
+
+from foxglove_fdw.recording_attachments import FoxgloveRecordingAttachmentsFDW  # noqa: E402
+
+ATTACHMENTS = [
+    {"id": "a1", "logTime": "2025-08-09T20:20:12.123456Z", "createTime": "2025-08-10T00:00:00Z", "crc": 5},
+    {"id": "a2", "logTime": "2025-08-09T20:20:13Z", "createTime": "2025-08-10T00:00:01Z", "crc": 6},
+]
+
+
+def scan(quals):
+    fdw = FoxgloveRecordingAttachmentsFDW({"api_key": "k"}, {})
+    fdw._iter_pages = lambda params, limit_: iter(ATTACHMENTS)  # type: ignore[method-assign]
+    return [r["id"] for r in fdw.execute(quals, ["id"])]
+
+
+def test_timestamp_equality_matches_api_iso_string():
+    ts = dt.datetime(2025, 8, 9, 20, 20, 12, 123456, tzinfo=dt.timezone.utc)
+    assert scan([multicorn.Qual("log_time", "=", ts)]) == ["a1"]
+    create = dt.datetime(2025, 8, 10, 0, 0, 1, tzinfo=dt.timezone.utc)
+    assert scan([multicorn.Qual("create_time", "=", create)]) == ["a2"]
+
+
+def test_integer_equality():
+    assert scan([multicorn.Qual("crc", "=", 5)]) == ["a1"]
+    assert scan([multicorn.Qual("crc", "=", 7)]) == []